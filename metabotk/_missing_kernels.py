@@ -0,0 +1,132 @@
+"""
+Numerical kernels for counting missing values in large matrices
+
+The kernels are compiled with numba when it is installed; otherwise the
+counts are computed with NumPy, one block of the matrix at a time.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
+
+# number of columns counted together by each thread in _nan_counts_strided
+COLUMN_BLOCK_SIZE = 256
+# number of values whose NaN mask is built at once by _nan_counts_blocked
+MASK_BLOCK_SIZE = 1 << 18
+# float dtypes supported by numba; the others are counted with NumPy
+COMPILED_DTYPES = (np.float32, np.float64)
+
+
+def _nan_counts_contiguous(values):
+    """
+    Count the NaNs in each row of a C-contiguous matrix, in parallel over rows.
+
+    Parameters:
+        values (ndarray): C-contiguous float matrix (n_rows x n_columns)
+
+    Returns:
+        counts (ndarray): number of NaNs of each row
+    """
+    n_rows, n_columns = values.shape
+    counts = np.zeros(n_rows, dtype=np.int64)
+    for row in prange(n_rows):
+        count = 0
+        for column in range(n_columns):
+            value = values[row, column]
+            count += value != value
+        counts[row] = count
+    return counts
+
+
+def _nan_counts_strided(values):
+    """
+    Count the NaNs in each column of a C-contiguous matrix, in parallel over
+    blocks of columns, so that each thread reads its rows contiguously.
+
+    Parameters:
+        values (ndarray): C-contiguous float matrix (n_rows x n_columns)
+
+    Returns:
+        counts (ndarray): number of NaNs of each column
+    """
+    n_rows, n_columns = values.shape
+    counts = np.zeros(n_columns, dtype=np.int64)
+    n_blocks = (n_columns + COLUMN_BLOCK_SIZE - 1) // COLUMN_BLOCK_SIZE
+    for block in prange(n_blocks):
+        start = block * COLUMN_BLOCK_SIZE
+        stop = min(start + COLUMN_BLOCK_SIZE, n_columns)
+        block_counts = np.zeros(stop - start, dtype=np.int64)
+        for row in range(n_rows):
+            block_values = values[row, start:stop]
+            for column in range(stop - start):
+                value = block_values[column]
+                block_counts[column] += value != value
+        counts[start:stop] = block_counts
+    return counts
+
+
+def _nan_counts_blocked(values, axis=0):
+    """
+    Count the NaNs in each column or row of a matrix with NumPy.
+
+    The NaN mask is built for one contiguous block of rows (or of columns for
+    F-contiguous matrices) at a time, so that it stays small enough to remain
+    in cache instead of being as large as the whole matrix.
+
+    Parameters:
+        values (ndarray): float matrix (n_rows x n_columns)
+        axis (int): axis along which to count the NaNs
+
+    Returns:
+        counts (ndarray): number of NaNs of each column/row
+    """
+    block_axis = 1 if values.flags.f_contiguous and not values.flags.c_contiguous else 0
+    block_size = max(1, MASK_BLOCK_SIZE // max(values.shape[1 - block_axis], 1))
+    counts = np.zeros(values.shape[1 - axis], dtype=np.int64)
+    for start in range(0, values.shape[block_axis], block_size):
+        block = slice(start, start + block_size)
+        block_values = values[block] if block_axis == 0 else values[:, block]
+        block_counts = np.count_nonzero(np.isnan(block_values), axis=axis)
+        if block_axis == axis:
+            counts += block_counts
+        else:
+            counts[block] = block_counts
+    return counts
+
+
+if njit is not None:
+    _nan_counts_contiguous = njit(parallel=True, cache=True)(_nan_counts_contiguous)
+    _nan_counts_strided = njit(parallel=True, cache=True)(_nan_counts_strided)
+
+
+def nan_counts(values, axis=0):
+    """
+    Count the NaNs in each column or row of a float matrix.
+
+    The matrix is read in its memory layout, without copies or intermediate
+    boolean masks, when it is C- or F-contiguous. Matrices of other dtypes
+    than float32 and float64 (e.g. float16, which numba does not support) are
+    counted with NumPy.
+
+    Parameters:
+        values (ndarray): float matrix (n_rows x n_columns)
+        axis (int): axis along which to count the NaNs; 0 gives the counts
+            of the columns, 1 the counts of the rows
+
+    Returns:
+        counts (ndarray): number of NaNs of each column/row
+    """
+    if njit is None or values.dtype not in COMPILED_DTYPES:
+        return _nan_counts_blocked(values, axis=axis)
+    # count along axis 1 of a C-contiguous matrix
+    if axis == 0:
+        values = values.T
+    if values.flags.c_contiguous:
+        return _nan_counts_contiguous(values)
+    if values.flags.f_contiguous:
+        return _nan_counts_strided(values.T)
+    return _nan_counts_contiguous(np.ascontiguousarray(values))
@@ -0,0 +1,121 @@
+"""
+Numerical kernels for fitting linear models on many metabolites at once
+
+The kernels are compiled with numba when it is installed, the first time they
+are called; otherwise the same functions are run as plain NumPy code.
+"""
+
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
+
+# minimum number of metabolites for which the residuals are computed in parallel
+PARALLEL_MIN_COLUMNS = 1000
+
+
+def _solve_normal_equations(XtX, XtY):
+    """
+    Solve the normal equations through the Cholesky factorization of X'X.
+
+    Parameters:
+        XtX (ndarray): X'X matrix (n_parameters x n_parameters)
+        XtY (ndarray): X'Y matrix (n_parameters x n_metabolites)
+
+    Returns:
+        beta (ndarray): coefficients (n_parameters x n_metabolites)
+    """
+    return cho_solve(cho_factor(XtX), XtY)
+
+
+def _solve_normal_equations_compiled(XtX, XtY):
+    """
+    Solve the normal equations through the Cholesky factorization of X'X,
+    using only the linear algebra functions supported by numba.
+
+    Parameters:
+        XtX (ndarray): X'X matrix (n_parameters x n_parameters)
+        XtY (ndarray): X'Y matrix (n_parameters x n_metabolites)
+
+    Returns:
+        beta (ndarray): coefficients (n_parameters x n_metabolites)
+    """
+    L = np.linalg.cholesky(XtX)
+    return np.linalg.solve(L.T, np.linalg.solve(L, XtY))
+
+
+def _batch_residuals(X, Y):
+    """
+    Compute the least squares residuals of each column of Y on X.
+
+    The coefficients are obtained by solving the normal equations with a
+    Cholesky factorization, so X is expected to have full column rank.
+
+    Parameters:
+        X (ndarray): design matrix (n_samples x n_parameters)
+        Y (ndarray): response matrix (n_samples x n_metabolites)
+
+    Returns:
+        residuals (ndarray): residuals with the same shape as Y
+    """
+    XtX = X.T @ X
+    XtY = X.T @ Y
+    beta = _solve_normal_equations(XtX, XtY)
+    return Y - X @ beta
+
+
+def _batch_residuals_parallel(X, Y):
+    """
+    Compute the least squares residuals of each column of Y on X, in parallel
+    over the columns of Y.
+
+    Parameters:
+        X (ndarray): design matrix (n_samples x n_parameters)
+        Y (ndarray): response matrix (n_samples x n_metabolites)
+
+    Returns:
+        residuals (ndarray): residuals with the same shape as Y
+    """
+    XtX = X.T @ X
+    XtY = X.T @ Y
+    beta = _solve_normal_equations(XtX, XtY)
+    residuals = np.empty_like(Y)
+    for column in prange(Y.shape[1]):
+        residuals[:, column] = Y[:, column] - X @ np.ascontiguousarray(beta[:, column])
+    return residuals
+
+
+if njit is not None:
+    _solve_normal_equations = njit(cache=True)(_solve_normal_equations_compiled)
+    _batch_residuals = njit(cache=True)(_batch_residuals)
+    _batch_residuals_parallel = njit(parallel=True, cache=True)(
+        _batch_residuals_parallel
+    )
+
+
+def batch_residuals(X, Y):
+    """
+    Compute the least squares residuals of each column of Y on X.
+
+    The normal equations are solved without checking the rank of X: for a
+    rank deficient or badly conditioned X the Cholesky factorization may
+    fail with LinAlgError, but it can also return inaccurate residuals
+    without any error, so callers must check the conditioning of X'X first.
+
+    Parameters:
+        X (ndarray): C-contiguous float64 design matrix (n_samples x n_parameters)
+        Y (ndarray): C-contiguous float64 response matrix (n_samples x n_metabolites)
+
+    Returns:
+        residuals (ndarray): residuals with the same shape as Y
+
+    Raises:
+        LinAlgError: if the Cholesky factorization of X'X fails.
+    """
+    if njit is not None and Y.shape[1] >= PARALLEL_MIN_COLUMNS:
+        return _batch_residuals_parallel(X, Y)
+    return _batch_residuals(X, Y)
@@ -166,7 +166,7 @@ def cli():
         dest="fit_model",
         nargs="+",
         metavar=("formula", "model_dir"),
-        help="Fit a linear model to each metabolite and print the residuals to stdout; optionally, save the models as pickle files in a folder of choice",
+        help="Fit a linear model to each metabolite and print the residuals to stdout; optionally, save the model summaries as .npz files in a zip archive in a folder of choice",
     )
 
     analysis_options.add_argument(
@@ -315,7 +315,9 @@ def cli():
     if args.fit_model:
         if len(args.fit_model) == 2:
             residuals = metabotk_instance.models.get_linear_model_residuals(
-                formula=args.fit_model[0], models_path=args.fit_model[1]
+                formula=args.fit_model[0],
+                models_path=args.fit_model[1],
+                threads=args.threads,
             )
         else:
             residuals = metabotk_instance.models.get_linear_model_residuals(
@@ -1,7 +1,8 @@
 from typing import Union, Optional, Dict
+import numpy as np
 import pandas as pd
 from metabotk.providers_handler import MetabolonCDT
-from metabotk.utils import parse_input
+from metabotk.utils import parse_input, write_delimited_file, ID_DTYPE
 import warnings
 
 
@@ -23,6 +24,7 @@ class DatasetManager:
         data_provider: str = "metabolon",
         sample_id_column: str = None,
         metabolite_id_column: str = "CHEM_ID",
+        data_dtype=None,
     ) -> None:
         """
         Initialize the class.
@@ -31,10 +33,12 @@ class DatasetManager:
             data_provider (str): name of the data provider
             sample_id_column (str): name of the sample id column
             metabolite_id_column (str): name of the metabolite id column
+            data_dtype: dtype the imported data is converted to, "float32"
+                (to halve its memory) or "float64"; None keeps it as read
         """
         self._data_provider = data_provider.lower()
         if self._data_provider == "metabolon":
-            self.parser = MetabolonCDT()
+            self.parser = MetabolonCDT(data_dtype=data_dtype)
         else:
             raise NotImplementedError("This data provider is not supported yet")
         self._sample_id_column = sample_id_column
@@ -69,62 +73,75 @@ class DatasetManager:
         Raises:
             ValueError: If the sample ID column is not found in the data or the metabolite ID column is not found in chemical annotation.
         """
-        try:
-            # parse input data
-            parsed_chemical_annotation = parse_input(chemical_annotation)
-            parsed_sample_metadata = parse_input(sample_metadata)
-            parsed_data = parse_input(data)
-            if not self._sample_id_column:
-                if parsed_data.columns[0] in parsed_sample_metadata.columns:
-                    self._sample_id_column = parsed_data.columns[0]
-                else:
-                    raise ValueError(
-                        "No sample ID column found in data with correspondence in sample metadata"
-                    )
-            # check that sample ID column is found in data
-            if (self._sample_id_column in parsed_data.columns) and (
-                self._sample_id_column in parsed_sample_metadata.columns
-            ):
-                # set metadata and data
-                self.sample_metadata = parsed_sample_metadata
-                if self.sample_metadata is None:
-                    raise ValueError("Sample metadata is not properly initialized.")
-                if self.sample_metadata[self._sample_id_column].duplicated().any():
-                    warnings.warn(
-                        "Warning: there are duplicate values in the chosen sample column.\
-                        Consider choosing another column or renaming the duplicated samples"
-                    )
-                self.sample_metadata[self._sample_id_column] = self.sample_metadata[
-                    self._sample_id_column
-                ].astype(str)
-                self.sample_metadata.set_index(self._sample_id_column, inplace=True)
-                self.data = parsed_data
-                self.data.columns = [str(i) for i in self.data.columns]
-                self.data.set_index(self._sample_id_column, inplace=True)
-                # Drop samples not in data
-                self.sample_metadata = self.sample_metadata.loc[self.data.index]
-                self.samples = list(self.sample_metadata.index)
+        # parse input data
+        parsed_chemical_annotation = parse_input(chemical_annotation)
+        parsed_sample_metadata = parse_input(sample_metadata)
+        parsed_data = parse_input(data)
+        if not self._sample_id_column:
+            if parsed_data.columns[0] in parsed_sample_metadata.columns:
+                self._sample_id_column = parsed_data.columns[0]
             else:
-                raise ValueError("No sample ID column found in data")
-
-            # check that metabolite ID column is found in chemical annotation
-            if self._metabolite_id_column in parsed_chemical_annotation.columns:
-                self.chemical_annotation = parsed_chemical_annotation
-                self.chemical_annotation[self._metabolite_id_column] = (
-                    self.chemical_annotation[self._metabolite_id_column].astype(str)
+                raise ValueError(
+                    "Error setting up data: No sample ID column found in data with correspondence in sample metadata"
                 )
-                self.chemical_annotation.set_index(
-                    self._metabolite_id_column, inplace=True
-                )
-                # Cleanup data from metadata
-                self._remove_metadata_from_data()
-                # Update the chemical annotation data in the class
-                self._update_chemical_annotation()
+        # check that sample ID column is found in data
+        sample_id_column_found = (
+            self._sample_id_column in parsed_data.columns
+            and self._sample_id_column in parsed_sample_metadata.columns
+        )
+        if not sample_id_column_found:
+            raise ValueError("Error setting up data: No sample ID column found in data")
+        # set metadata and data
+        self.sample_metadata = parsed_sample_metadata
+        if self.sample_metadata[self._sample_id_column].duplicated().any():
+            warnings.warn(
+                "Warning: there are duplicate values in the chosen sample column.\
+                Consider choosing another column or renaming the duplicated samples"
+            )
+        self.sample_metadata[self._sample_id_column] = self._as_id_dtype(
+            self.sample_metadata[self._sample_id_column]
+        )
+        self.sample_metadata.set_index(self._sample_id_column, inplace=True)
+        self.data = parsed_data
+        if self.data.columns.dtype != ID_DTYPE:
+            self.data.columns = self.data.columns.astype(str).astype(ID_DTYPE)
+        self.data[self._sample_id_column] = self._as_id_dtype(
+            self.data[self._sample_id_column]
+        )
+        self.data.set_index(self._sample_id_column, inplace=True)
+        # Drop samples not in data
+        self.sample_metadata = self.sample_metadata.loc[self.data.index]
+        self.samples = list(self.sample_metadata.index)
 
-            else:
-                raise ValueError("No metabolite ID column found in chemical annotation")
-        except ValueError as ve:
-            raise ValueError(f"Error setting up data: {ve}")
+        # check that metabolite ID column is found in chemical annotation
+        if self._metabolite_id_column not in parsed_chemical_annotation.columns:
+            raise ValueError(
+                "Error setting up data: No metabolite ID column found in chemical annotation"
+            )
+        self.chemical_annotation = parsed_chemical_annotation
+        self.chemical_annotation[self._metabolite_id_column] = self._as_id_dtype(
+            self.chemical_annotation[self._metabolite_id_column]
+        )
+        self.chemical_annotation.set_index(self._metabolite_id_column, inplace=True)
+        # Cleanup data from metadata
+        self._remove_metadata_from_data()
+        # Update the chemical annotation data in the class
+        self._update_chemical_annotation()
+
+    @staticmethod
+    def _as_id_dtype(ids):
+        """
+        Convert sample or metabolite IDs to the ID dtype, if they are not already.
+
+        Parameters:
+            ids (Series or Index): IDs to convert.
+
+        Returns:
+            Series or Index: IDs with the ID dtype.
+        """
+        if ids.dtype == ID_DTYPE:
+            return ids
+        return ids.astype(ID_DTYPE)
 
     def import_excel(
         self,
@@ -132,6 +149,7 @@ class DatasetManager:
         sample_metadata: str = "sample_metadata",
         chemical_annotation: str = "chemical_annotation",
         data_sheet: str = "data",
+        cache: bool = False,
     ) -> None:
         """
         Import data from an Excel file and set up the class.
@@ -142,6 +160,9 @@ class DatasetManager:
             Path to the Excel file.
         data_sheet : str
             Name of the sheet containing the main data.
+        cache : bool
+            Whether to cache the parsed sheets next to the Excel file, so that
+            later imports of the unmodified file do not parse it again.
 
         Raises
         ------
@@ -154,7 +175,7 @@ class DatasetManager:
         """
         try:
             self.parser.import_excel(
-                file_path, sample_metadata, chemical_annotation, data_sheet
+                file_path, sample_metadata, chemical_annotation, data_sheet, cache
             )
             self._setup_data(
                 self.parser.chemical_annotation,
@@ -217,11 +238,38 @@ class DatasetManager:
 
         """
         # Merge sample metadata and data by matching sample IDs
-        merged = self.sample_metadata.merge(
-            self.data, left_index=True, right_index=True, how="inner"
-        )
+        merged = self._join_on_index(self.sample_metadata, self.data, how="inner")
         return merged
 
+    @staticmethod
+    def _join_on_index(left, right, how="inner"):
+        """
+        Join two dataframes on their index.
+
+        When both indices are unique and the dataframes share no column names,
+        the dataframes are aligned with pd.concat, which avoids the hash join
+        performed by DataFrame.merge; otherwise DataFrame.merge is used, so that
+        duplicated IDs and overlapping column names are handled as before.
+
+        Parameters:
+            left (DataFrame): Left dataframe, whose index order is kept.
+            right (DataFrame): Right dataframe.
+            how (str): "inner" to keep the IDs present in both dataframes,
+                "left" to keep all the IDs of the left dataframe.
+
+        Returns:
+            DataFrame: Joined DataFrame.
+        """
+        if (
+            right.index.is_unique
+            and (how == "left" or left.index.is_unique)
+            and left.columns.intersection(right.columns).empty
+        ):
+            if how == "left":
+                return pd.concat([left, right.reindex(left.index)], axis=1)
+            return pd.concat([left, right], axis=1, join="inner")
+        return left.merge(right, left_index=True, right_index=True, how=how)
+
     def save_merged(self, data_path, chemical_annotation_path=None):
         """
         Save the merged sample data and metabolite abundance data to TSV files.
@@ -240,9 +288,9 @@ class DatasetManager:
         merged = self.merge_sample_metadata_data()
         if len(merged) == 0:
             raise ValueError("Trying to save an empty dataframe")
-        merged.to_csv(data_path, sep="\t")
+        write_delimited_file(merged, data_path)
         if chemical_annotation_path:
-            self.chemical_annotation.to_csv(chemical_annotation_path, sep="\t")
+            write_delimited_file(self.chemical_annotation, chemical_annotation_path)
 
     def save_tables(
         self,
@@ -276,11 +324,11 @@ class DatasetManager:
         if len(self.data) == 0:
             raise ValueError("Trying to save an empty dataframe")
         if data_path:
-            self.data.to_csv(data_path, sep="\t")
+            write_delimited_file(self.data, data_path)
         if chemical_annotation_path:
-            self.chemical_annotation.to_csv(chemical_annotation_path, sep="\t")
+            write_delimited_file(self.chemical_annotation, chemical_annotation_path)
         if sample_metadata_path:
-            self.sample_metadata.to_csv(sample_metadata_path, sep="\t")
+            write_delimited_file(self.sample_metadata, sample_metadata_path)
 
     def save_excel(self, file_path, data_sheet="data"):
         """
@@ -348,21 +396,18 @@ class DatasetManager:
 
         # Check that all features have annotation
         not_annotated = list(
-            set(self.data.columns).difference(set(self.chemical_annotation.index))
+            self.data.columns.difference(self.chemical_annotation.index, sort=False)
         )
         if len(not_annotated) > 0:
             raise ValueError(f"Missing chemical annotation for {not_annotated}")
 
         # Create dictionary for renaming
-        renaming_dict = {
-            old: new
-            for old, new in zip(
-                self.chemical_annotation.index, self.chemical_annotation[new_column]
-            )
-        }
+        renaming_dict = dict(
+            zip(self.chemical_annotation.index, self.chemical_annotation[new_column])
+        )
 
         # Perform the renaming
-        self.data.columns = [renaming_dict[old] for old in self.data.columns]
+        self.data.rename(columns=renaming_dict, inplace=True)
 
         # Update the name of the column used for feature identification in the data
         self._metabolite_id_column = new_column
@@ -419,6 +464,47 @@ class DatasetManager:
         except ValueError as ve:
             raise ValueError("Error removing metadata from data: {}".format(ve))
 
+    @classmethod
+    def _from_sliced(
+        cls,
+        sample_metadata: pd.DataFrame,
+        data: pd.DataFrame,
+        chemical_annotation: pd.DataFrame,
+        data_provider: str = "metabolon",
+        sample_id_column: str = None,
+        metabolite_id_column: str = "CHEM_ID",
+    ) -> "DatasetManager":
+        """
+        Create an instance from subsets of an already set up dataset.
+
+        The tables are expected to be indexed by sample and metabolite IDs, as
+        they are after the data has been imported; the parsing and validation
+        done by `_setup_data` are skipped, and the sample metadata and chemical
+        annotation are only aligned to the samples and metabolites in the data.
+
+        Parameters:
+            sample_metadata (DataFrame): sample metadata indexed by sample ID
+            data (DataFrame): data indexed by sample ID, with metabolite IDs as columns
+            chemical_annotation (DataFrame): chemical annotation indexed by metabolite ID
+            data_provider (str): name of the data provider
+            sample_id_column (str): name of the sample id column
+            metabolite_id_column (str): name of the metabolite id column
+
+        Returns:
+            DatasetManager: new instance containing the given tables
+        """
+        instance = cls(
+            data_provider=data_provider,
+            sample_id_column=sample_id_column,
+            metabolite_id_column=metabolite_id_column,
+        )
+        instance.data = data
+        instance.sample_metadata = sample_metadata
+        instance.chemical_annotation = chemical_annotation
+        instance._update_sample_metadata()
+        instance._update_chemical_annotation()
+        return instance
+
     def _split_by_sample_column(self, column: list) -> Dict[str, "DatasetManager"]:
         """
         Split the dataset (data and sample metadata) in multiple independent DataClass instances
@@ -436,25 +522,18 @@ class DatasetManager:
         Returns:
             A dictionary containing the split data, where the dictionary keys are the unique
             values of the sample metadata column and the values are the DataClass instances
-            containing the split data.
+            containing the split data, of the same class as this instance.
         """
         split_data: Dict[str, DatasetManager] = {}
         for name, group in self.sample_metadata.groupby(by=column):
-            tempdata = self.data.loc[group.index]
-            tempclass = DatasetManager(
+            split_data[name] = self._from_sliced(
+                sample_metadata=group,
+                data=self.data.loc[group.index],
+                chemical_annotation=self.chemical_annotation,
                 data_provider=self._data_provider,
                 sample_id_column=self._sample_id_column,
                 metabolite_id_column=self._metabolite_id_column,
             )
-            tempclass.import_tables(
-                data=tempdata.reset_index(),
-                chemical_annotation=self.chemical_annotation.reset_index(),
-                sample_metadata=group.reset_index(),
-            )
-            tempclass._update_chemical_annotation()
-            tempclass._update_sample_metadata()
-            tempclass._remove_metadata_from_data()
-            split_data[name] = tempclass
         return split_data
 
     def _split_by_metabolite_column(self, column: str) -> Dict[str, "DatasetManager"]:
@@ -466,25 +545,41 @@ class DatasetManager:
         column (str): Name of the column in the metabolite metadata table to use for splitting
 
         Returns:
-        Dict[str, DatasetManager]: dictionary where keys are the unique values present in the column and values are the corresponding DataClass instances
+        Dict[str, DatasetManager]: dictionary where keys are the unique values present in the column and values are the corresponding DataClass instances, of the same class as this instance
         """
         split_data: Dict[str, "DatasetManager"] = {}
         for name, group in self.chemical_annotation.groupby(by=column):
-            tempdata = self.data[list(group.index)]
-            tempclass = DatasetManager(
+            split_data[name] = self._from_sliced(
+                sample_metadata=self.sample_metadata,
+                data=self.data[list(group.index)],
+                chemical_annotation=group,
                 data_provider=self._data_provider,
                 sample_id_column=self._sample_id_column,
                 metabolite_id_column=self._metabolite_id_column,
             )
-            tempclass.import_tables(
-                data=tempdata.reset_index(),
-                chemical_annotation=group.reset_index(),
-                sample_metadata=self.sample_metadata.reset_index(),
-            )
-            tempclass._update_chemical_annotation()
-            split_data[name] = tempclass
         return split_data
 
+    @staticmethod
+    def _labels_to_drop(labels, axis_labels):
+        """
+        Convert the labels to drop to strings and check that they exist.
+
+        Parameters:
+            labels (list): labels to drop
+            axis_labels (Index): labels of the axis to drop them from
+
+        Returns:
+            Index: labels to drop, as strings
+
+        Raises:
+            KeyError: If some of the labels are not found in the axis.
+        """
+        to_drop = pd.Index(labels).astype(str)
+        not_found = to_drop[~to_drop.isin(axis_labels)]
+        if len(not_found) > 0:
+            raise KeyError(f"{list(not_found)} not found in axis")
+        return to_drop
+
     def drop_samples(self, samples_to_drop, inplace=True):
         """
         Drop specified samples from the dataset.
@@ -503,7 +598,8 @@ class DatasetManager:
         """
         if not isinstance(samples_to_drop, list):
             samples_to_drop = [samples_to_drop]
-        remaining = self.data.drop(index=[str(i) for i in samples_to_drop])
+        to_drop = self._labels_to_drop(samples_to_drop, self.data.index)
+        remaining = self.data.loc[~self.data.index.isin(to_drop)]
         if inplace:
             self.data = remaining
             self._update_sample_metadata()
@@ -529,7 +625,8 @@ class DatasetManager:
         """
         if not isinstance(metabolites_to_drop, list):
             metabolites_to_drop = [metabolites_to_drop]
-        remaining = self.data.drop(columns=[str(i) for i in metabolites_to_drop])
+        to_drop = self._labels_to_drop(metabolites_to_drop, self.data.columns)
+        remaining = self.data.loc[:, ~self.data.columns.isin(to_drop)]
         if inplace:
             self.data = remaining
             self._update_chemical_annotation()
@@ -554,10 +651,14 @@ class DatasetManager:
         pandas.DataFrame or None
             If `inplace` is False, the resulting data after dropping the metabolites, otherwise None
         """
+        # compare only the unique pathway names; missing pathways get code -1,
+        # which points to the trailing False
+        codes, pathways = pd.factorize(self.chemical_annotation["SUPER_PATHWAY"])
+        is_xenobiotic = np.append(
+            pd.Index(pathways).str.lower() == "xenobiotics", False
+        )
         xenobiotic_metabolites = list(
-            self.chemical_annotation[
-                self.chemical_annotation["SUPER_PATHWAY"].str.lower() == "xenobiotics"
-            ].index
+            self.chemical_annotation.index[is_xenobiotic[codes]]
         )
         if inplace:
             self.drop_metabolites(xenobiotic_metabolites, inplace=True)
@@ -584,10 +685,10 @@ class DatasetManager:
         """
         if not isinstance(metabolites_to_extract, list):
             metabolites_to_extract = [metabolites_to_extract]
-        return self.sample_metadata.merge(
+        return self._join_on_index(
+            self.sample_metadata,
             self.data[[str(i) for i in metabolites_to_extract]],
-            left_index=True,
-            right_index=True,
+            how="inner",
         )
 
     def extract_samples(self, samples_to_extract):
@@ -609,11 +710,8 @@ class DatasetManager:
         """
         if not isinstance(samples_to_extract, list):
             samples_to_extract = [samples_to_extract]
-        return self.sample_metadata.loc[samples_to_extract].merge(
-            self.data,
-            left_index=True,
-            right_index=True,
-            how="left",
+        return self._join_on_index(
+            self.sample_metadata.loc[samples_to_extract], self.data, how="left"
         )
 
     def extract_chemical_annotations(self, metabolites_to_extract):
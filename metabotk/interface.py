@@ -23,6 +23,7 @@ class MetaboTK(DatasetManager):
         data_provider="metabolon",
         sample_id_column=None,
         metabolite_id_column="CHEM_ID",
+        data_dtype=None,
     ) -> None:
         """
         Initialize the class.
@@ -31,6 +32,7 @@ class MetaboTK(DatasetManager):
             data_provider=data_provider,
             sample_id_column=sample_id_column,
             metabolite_id_column=metabolite_id_column,
+            data_dtype=data_dtype,
         )
 
     @property
@@ -115,7 +117,7 @@ class MetaboTK(DatasetManager):
             inplace (bool): Whether to drop missing values inplace or return the remaining data.
 
         Returns:
-            DataFrame: DataFrame with missing values over threshold removed.
+            DataFrame: Copy of the data with missing values over threshold removed.
         """
         remaining_data = self.missing._drop_missing_from_dataframe(
             data_frame=self.data, axis=axis, threshold=threshold
@@ -126,7 +128,41 @@ class MetaboTK(DatasetManager):
             print("Removed inplace metabolites with missing data over threshold")
             return None
         else:
-            return remaining_data
+            # the handler may return a view of self.data
+            return remaining_data.copy()
+
+    def drop_missing_from_both_axes(
+        self, threshold=0.25, columns_first=True, inplace=False
+    ):
+        """
+        Removes metabolites and samples from the data dataframe based on the
+        threshold of missing values, detecting the missing values only once.
+        The result is the same as calling drop_missing_from_dataframe on the
+        metabolites and then on the samples (or the other way around), and
+        with inplace=False it is a copy that does not share memory with the data.
+
+        Parameters:
+            threshold (float): Threshold of missing values to drop.
+            columns_first (bool): Whether to remove the metabolites before the samples.
+            inplace (bool): Whether to drop missing values inplace or return the remaining data.
+
+        Returns:
+            DataFrame: Copy of the data with missing values over threshold removed.
+        """
+        remaining_data = self.missing._drop_missing_from_both_axes(
+            data_frame=self.data, threshold=threshold, columns_first=columns_first
+        )
+        if inplace:
+            self.data = remaining_data
+            self._update_chemical_annotation()
+            self._update_sample_metadata()
+            print(
+                "Removed inplace metabolites and samples with missing data over threshold"
+            )
+            return None
+        else:
+            # the handler may return a view of self.data
+            return remaining_data.copy()
 
     def split_by_sample_column(self, columns: List[str]) -> Dict[str, "MetaboTK"]:
         """
@@ -138,21 +174,7 @@ class MetaboTK(DatasetManager):
         Returns:
             dict: Dictionary with the split data and sample metadata, as a MetaboTK instance.
         """
-        split_data = self._split_by_sample_column(columns)
-        split_data_instanced = {}
-        for dataset_name, dataset_instance in split_data.items():
-            temp_instance = MetaboTK(
-                sample_id_column=self._sample_id_column,
-                data_provider=self._data_provider,
-                metabolite_id_column=self._metabolite_id_column,
-            )
-            temp_instance.import_tables(
-                data=dataset_instance.data.reset_index(),
-                sample_metadata=dataset_instance.sample_metadata.reset_index(),
-                chemical_annotation=dataset_instance.chemical_annotation.reset_index(),
-            )
-            split_data_instanced[dataset_name] = temp_instance
-        return split_data_instanced
+        return self._split_by_sample_column(columns)
 
     def split_by_metabolite_column(self, columns: List[str]) -> Dict[str, "MetaboTK"]:
         """
@@ -164,18 +186,4 @@ class MetaboTK(DatasetManager):
         Returns:
             dict: Dictionary with the split data and sample metadata as a MetaboTK instance.
         """
-        split_data = self._split_by_metabolite_column(columns)
-        split_data_instanced = {}
-        for dataset_name, dataset_instance in split_data.items():
-            temp_instance = MetaboTK(
-                sample_id_column=self._sample_id_column,
-                data_provider=self._data_provider,
-                metabolite_id_column=self._metabolite_id_column,
-            )
-            temp_instance.import_tables(
-                data=dataset_instance.data.reset_index(),
-                sample_metadata=dataset_instance.sample_metadata.reset_index(),
-                chemical_annotation=dataset_instance.chemical_annotation.reset_index(),
-            )
-            split_data_instanced[dataset_name] = temp_instance
-        return split_data_instanced
+        return self._split_by_metabolite_column(columns)
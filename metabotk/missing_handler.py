@@ -1,9 +1,62 @@
+from functools import lru_cache
+
 import numpy as np
 
 import pandas as pd
+from metabotk import _missing_kernels
 from metabotk.utils import validate_dataframe
 
 
+@lru_cache(maxsize=16)
+def _max_missing(threshold, n_values):
+    """
+    Computes the largest number of missing values within the threshold.
+
+    The result is the largest count c with c / n_values <= threshold. The
+    product threshold * n_values can be rounded to just below or above an
+    integer (e.g. 0.29 * 100 gives 28.999999999999996), so the truncated
+    product is corrected by one where needed, using the same division as
+    the comparison it replaces.
+
+    Parameters:
+        threshold (float): Maximum allowed fraction of missing values.
+        n_values (int): Number of values in each row/column.
+
+    Returns:
+        int: Largest count whose fraction does not exceed the threshold, 0 if
+        n_values is 0.
+    """
+    if n_values == 0:
+        return 0
+    max_missing = int(threshold * n_values)
+    # correct the rounding of the product, so that the comparison gives
+    # the same result as comparing count / n_values with the threshold
+    if (max_missing + 1) / n_values <= threshold:
+        max_missing += 1
+    elif max_missing / n_values > threshold:
+        max_missing -= 1
+    return max_missing
+
+
+def _positions(keep):
+    """
+    Converts a boolean mask to the positions to select with iloc.
+
+    Parameters:
+        keep (ndarray): Boolean mask of the rows/columns to keep.
+
+    Returns:
+        slice or ndarray: A slice if the kept rows/columns are contiguous, so
+        that iloc returns a view, otherwise the array of their positions.
+    """
+    positions = np.flatnonzero(keep)
+    if len(positions) == 0:
+        return slice(0, 0)
+    if positions[-1] - positions[0] + 1 == len(positions):
+        return slice(positions[0], positions[-1] + 1)
+    return positions
+
+
 class MissingDataHandler:
     """
     Class for detecting and counting missing values in data,
@@ -24,11 +77,16 @@ class MissingDataHandler:
     def _validate_threshold(self, threshold):
         """
         Validates the threshold attribute.
+
+        Returns:
+            float: The threshold converted to float, to be used for the
+            numeric comparisons of the call.
         """
         if not isinstance(threshold, (int, float)):
             raise TypeError("Threshold must be a numeric value")
         if not 0 <= threshold <= 1:
             raise ValueError("Threshold must be between 0 and 1")
+        return float(threshold)
 
     def _detect_missing(self, data) -> np.array:
         """
@@ -40,10 +98,32 @@ class MissingDataHandler:
         Returns:
             Boolean array indicating missing (True) and non-missing data (False).
         """
-
-        is_missing = np.isnan(data)
+        is_missing = self._missing_mask(data)
+        if isinstance(data, pd.Series):
+            return pd.Series(is_missing, index=data.index, name=data.name)
         return is_missing
 
+    def _missing_mask(self, data):
+        """
+        Detects missing values in a collection, as a NumPy array.
+
+        Parameters:
+            data (list, array, or Series): Collection containing data.
+
+        Returns:
+            ndarray: Boolean array indicating missing (True) and non-missing data (False).
+        """
+        if isinstance(data, pd.Series) and not isinstance(data.dtype, np.dtype):
+            # nullable and pyarrow arrays already keep track of missing values
+            return np.asarray(data.array.isna(), dtype=bool)
+        values = np.asarray(data)
+        if values.dtype.kind in "iub":
+            # integer and boolean values cannot be missing
+            return np.zeros(values.shape, dtype=bool)
+        if values.dtype.kind == "O":
+            return pd.isna(values)
+        return np.isnan(values)
+
     def _count_missing(self, data):
         """
         Counts missing values in a collection.
@@ -55,8 +135,8 @@ class MissingDataHandler:
             Number of missing values in collection
         """
 
-        missing = self._detect_missing(data)
-        n_missing = missing.sum()
+        missing = self._missing_mask(data)
+        n_missing = np.count_nonzero(missing)
         return n_missing
 
     def _count_missing_in_dataframe(self, data_frame, axis=0):
@@ -72,10 +152,75 @@ class MissingDataHandler:
             Series: Pandas Series with the row/column index and the number of missing values.
         """
         validate_dataframe(data_frame)
-        missing_values = data_frame.apply(self._detect_missing, axis=axis)
-        n_missing_values = missing_values.sum(axis=axis)
+        n_missing_values = pd.Series(
+            self._missing_counts(data_frame, axis=axis),
+            index=data_frame.columns if axis == 0 else data_frame.index,
+        )
         return n_missing_values
 
+    def _missing_counts(self, data_frame, axis=0):
+        """
+        Counts missing values in each row or column of a DataFrame as an array.
+
+        The missing values are detected in a single pass over the values of the
+        DataFrame as a NumPy array, without building intermediate DataFrames,
+        if all its columns are floats; they are counted with the compiled
+        kernels if numba is installed.
+        The DataFrame is not validated again: callers validate it once.
+
+        Parameters:
+            data_frame (DataFrame): Pandas DataFrame containing only numeric values.
+            axis (int, optional): Axis along which to count missing values.
+                0 for columns, 1 for rows. Default is 0.
+
+        Returns:
+            ndarray: Number of missing values of each row/column.
+        """
+        if all(
+            isinstance(dtype, np.dtype) and dtype.kind == "f"
+            for dtype in data_frame.dtypes
+        ):
+            return _missing_kernels.nan_counts(data_frame.to_numpy(), axis=axis)
+        # detect the missing values column by column, using the masks of the
+        # nullable columns instead of converting them to an object array
+        return np.count_nonzero(data_frame.isna().to_numpy(), axis=axis)
+
+    def _max_missing(self, threshold, n_values):
+        """
+        Computes the largest number of missing values within the threshold.
+
+        A row/column with more missing values than this has a fraction of
+        missing values higher than the threshold, so counts can be compared
+        directly with it instead of dividing each of them by n_values.
+
+        Parameters:
+            threshold (float): Maximum allowed fraction of missing values.
+            n_values (int): Number of values in each row/column.
+
+        Returns:
+            int: Largest count whose fraction does not exceed the threshold.
+        """
+        # the cutoffs are cached, as the same threshold is applied again and
+        # again to frames with the same number of rows/columns
+        return _max_missing(threshold, n_values)
+
+    def _over_threshold(self, data_frame, axis=0, threshold=0.25):
+        """
+        Finds the columns or rows with missing values above the threshold.
+
+        Parameters:
+            data_frame (DataFrame): Pandas DataFrame containing only numeric values.
+            axis (int, optional): 0 for columns, 1 for rows. Default is 0.
+            threshold (float, optional): Maximum allowed fraction of missing values.
+
+        Returns:
+            ndarray: Boolean array, True for the columns/rows over the threshold.
+        """
+        threshold = self._validate_threshold(threshold)
+        validate_dataframe(data_frame)
+        missing = self._missing_counts(data_frame, axis=axis)
+        return missing > self._max_missing(threshold, data_frame.shape[axis])
+
     def _drop_columns_with_missing(self, data_frame, threshold=0.25):
         """
         Removes columns with missing values above the threshold.
@@ -86,11 +231,9 @@ class MissingDataHandler:
         Returns:
             DataFrame: DataFrame with columns with missingness higher than the threshold.
         """
-        self._validate_threshold(threshold)
-        validate_dataframe(data_frame)
-        missing = self._count_missing_in_dataframe(data_frame, axis=0)
-        to_drop = missing[missing / len(data_frame) > threshold]
-        to_drop = data_frame[list(to_drop.index)]
+        to_drop = data_frame.loc[
+            :, self._over_threshold(data_frame, axis=0, threshold=threshold)
+        ]
         return to_drop
 
     def _drop_rows_with_missing(self, data_frame, threshold=0.25):
@@ -103,11 +246,9 @@ class MissingDataHandler:
         Returns:
             DataFrame: DataFrame with rows with missingness higher than the threshold.
         """
-        self._validate_threshold(threshold)
-        validate_dataframe(data_frame)
-        missing = self._count_missing_in_dataframe(data_frame, axis=1)
-        to_drop = missing[missing / len(data_frame.columns) > threshold]
-        to_drop = data_frame.loc[to_drop.index]
+        to_drop = data_frame.loc[
+            self._over_threshold(data_frame, axis=1, threshold=threshold)
+        ]
         return to_drop
 
     def _drop_missing_from_dataframe(
@@ -116,6 +257,11 @@ class MissingDataHandler:
         """
         Remove columns or rows with missing values above the threshold.
 
+        The remaining columns/rows are selected in a single step, without
+        building the DataFrame of the dropped ones. If they are contiguous
+        (e.g. when nothing is removed) the result is a view that shares memory
+        with data_frame; call .copy() on it before modifying it in place.
+
         Parameters:
             - threshold: missingness over which to remove the row/column
             - axis: {0 or ‘index’, remove columns, 1 or ‘columns’, remove rows}, default 0
@@ -124,17 +270,71 @@ class MissingDataHandler:
             DataFrame: DataFrame containing the rows/columns dropped.
         """
         if axis == 0:
-            to_drop = self._drop_columns_with_missing(
-                data_frame=data_frame, threshold=threshold
-            )
-            print(f"Removed {len(to_drop.columns)} columns")
-            remaining_data = data_frame.drop(columns=to_drop.columns)
+            to_drop = self._over_threshold(data_frame, axis=0, threshold=threshold)
+            print(f"Removed {np.count_nonzero(to_drop)} columns")
+            remaining_data = data_frame.iloc[:, _positions(~to_drop)]
             return remaining_data
 
         if axis == 1:
-            to_drop = self._drop_rows_with_missing(
-                data_frame=data_frame, threshold=threshold
-            )
-            print(f"Removed {len(to_drop.index)} rows")
-            remaining_data = data_frame.drop(index=to_drop.index)
+            to_drop = self._over_threshold(data_frame, axis=1, threshold=threshold)
+            print(f"Removed {np.count_nonzero(to_drop)} rows")
+            remaining_data = data_frame.iloc[_positions(~to_drop)]
             return remaining_data
+
+    def _drop_missing_from_both_axes(
+        self,
+        data_frame: pd.DataFrame,
+        threshold: float = 0.25,
+        columns_first: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Remove columns and rows with missing values above the threshold.
+
+        The result is the same as removing the columns and then the rows (or
+        the rows and then the columns) with _drop_missing_from_dataframe, but
+        the missing values are detected only once, and the remaining data is
+        selected in a single step. If the remaining rows and columns are
+        contiguous (e.g. when nothing is removed) the result is a view that
+        shares memory with data_frame; call .copy() on it before modifying it
+        in place.
+
+        Parameters:
+            - data_frame: Pandas DataFrame containing only numeric values
+            - threshold: missingness over which to remove the row/column
+            - columns_first: whether to remove the columns before the rows, default True
+
+        Returns:
+            DataFrame: DataFrame containing the remaining rows and columns.
+        """
+        threshold = self._validate_threshold(threshold)
+        validate_dataframe(data_frame)
+        missing = data_frame.isna().to_numpy()
+        n_rows, n_columns = missing.shape
+        if columns_first:
+            keep_columns = np.count_nonzero(missing, axis=0) <= self._max_missing(
+                threshold, n_rows
+            )
+            keep_rows = np.count_nonzero(
+                missing[:, keep_columns], axis=1
+            ) <= self._max_missing(threshold, np.count_nonzero(keep_columns))
+        else:
+            keep_rows = np.count_nonzero(missing, axis=1) <= self._max_missing(
+                threshold, n_columns
+            )
+            keep_columns = np.count_nonzero(
+                missing[keep_rows], axis=0
+            ) <= self._max_missing(threshold, np.count_nonzero(keep_rows))
+        removed_columns = (
+            f"Removed {n_columns - np.count_nonzero(keep_columns)} columns"
+        )
+        removed_rows = f"Removed {n_rows - np.count_nonzero(keep_rows)} rows"
+        if columns_first:
+            print(removed_columns)
+            print(removed_rows)
+        else:
+            print(removed_rows)
+            print(removed_columns)
+        remaining_data = data_frame.iloc[
+            _positions(keep_rows), _positions(keep_columns)
+        ]
+        return remaining_data
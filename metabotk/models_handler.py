@@ -1,8 +1,79 @@
+import io
+import pickle
+import zipfile
+from collections import namedtuple
 import numpy as np
-import statsmodels.formula.api as smf
+import pandas as pd
+import patsy
+from joblib import Parallel, delayed
+import statsmodels.api as sm
 import dill
+from metabotk import _ols_kernels
 from metabotk.utils import create_directory
 
+FitSummary = namedtuple(
+    "FitSummary",
+    [
+        "parameter_names",
+        "params",
+        "bse",
+        "tvalues",
+        "pvalues",
+        "rsquared",
+        "samples",
+        "resid",
+    ],
+)
+
+# condition number of X'X above which the normal equations are not used
+_MAX_CONDITION_NUMBER = 1 / np.sqrt(np.finfo(np.float64).eps)
+
+
+def _least_squares_residuals(X, Y):
+    """
+    Compute the residuals of the least squares fit of each column of Y on X.
+
+    All the columns of Y are solved together through the normal equations;
+    if X is rank deficient or badly conditioned the minimum norm solution from
+    np.linalg.lstsq is used instead, matching the pseudoinverse used by
+    statsmodels.
+
+    Parameters:
+        X (ndarray): design matrix (n_samples x n_parameters)
+        Y (ndarray): response matrix (n_samples x n_metabolites)
+
+    Returns:
+        residuals (ndarray): residuals with the same shape as Y
+    """
+    n_samples, n_parameters = X.shape
+    if 0 < n_parameters <= n_samples:
+        if np.linalg.cond(X.T @ X) < _MAX_CONDITION_NUMBER:
+            try:
+                return _ols_kernels.batch_residuals(X, Y)
+            except np.linalg.LinAlgError:
+                pass
+    beta, *_ = np.linalg.lstsq(X, Y, rcond=None)
+    return Y - X @ beta
+
+
+def _residual_maker_matrix(X):
+    """
+    Compute the residual maker matrix I - X pinv(X) of a design matrix.
+
+    Multiplying a response by this matrix gives the residuals of its least
+    squares fit on X; the pseudoinverse gives the same minimum norm solution
+    as np.linalg.lstsq when X is rank deficient.
+
+    Parameters:
+        X (ndarray): design matrix (n_samples x n_parameters)
+
+    Returns:
+        M (ndarray): residual maker matrix (n_samples x n_samples)
+    """
+    M = -(X @ np.linalg.pinv(X))
+    M[np.diag_indices_from(M)] += 1
+    return M
+
 
 class ModelsHandler:
     """
@@ -12,8 +83,10 @@ class ModelsHandler:
     formula specified in the constructor for each metabolite. The residuals
     are then extracted from the fitted models and returned as a pandas DataFrame.
 
-    If a path to a directory is provided, the fitted models will be saved as
-    pickle files in that directory.
+    If a path to a directory is provided, a summary of each fitted model
+    (parameters, standard errors, t-values, p-values, R-squared and residuals)
+    will be saved as a .npz file in a zip archive in that directory; the full
+    models can be saved as pickle files instead.
 
     Attributes:
         data_manager (DataManager): DataManager instance containing the data
@@ -33,8 +106,79 @@ class ModelsHandler:
         """
         self.data_manager = data_manager
         self.merged = self.data_manager.merge_sample_metadata_data()
-        self.residuals = self.data_manager.data.copy()
-        self.residuals.loc[:] = np.nan
+        data = self.data_manager.data
+        self.residuals = pd.DataFrame(
+            np.full(data.shape, np.nan), index=data.index, columns=data.columns
+        )
+        # metabolite values as a contiguous array, in the order of merged
+        self._Y = np.ascontiguousarray(
+            self.merged[self.data_manager.metabolites].to_numpy(dtype=np.float64)
+        )
+        # design matrices built so far, by formula
+        self._design_matrices = {}
+        # design matrix and metabolite values as arrays for the fast path, by formula
+        self._design_arrays = {}
+        # residual maker matrices of the design matrices, by formula
+        self._residual_makers = {}
+
+    def _design_matrix(self, formula):
+        """
+        Build the design matrix for a formula, reusing it across metabolites.
+
+        Samples with missing values in the covariates are dropped, as patsy
+        does when a model is fitted from a formula.
+
+        Parameters:
+            formula (str): right-hand side of the formula used to fit the model
+
+        Returns:
+            exog (DataFrame): design matrix indexed by sample
+            rows (ndarray): positions of the design matrix samples in merged
+        """
+        if formula not in self._design_matrices:
+            exog = patsy.dmatrix(
+                formula, self.merged.reset_index(drop=True), return_type="dataframe"
+            )
+            rows = exog.index.to_numpy()
+            exog.index = self.merged.index[rows]
+            self._design_matrices[formula] = (exog, rows)
+        return self._design_matrices[formula]
+
+    def _design_array(self, formula):
+        """
+        Get the design matrix and the matching metabolite values as arrays.
+
+        Both are contiguous float64 arrays, so the least squares solves work
+        directly on them without any pandas conversion.
+
+        Parameters:
+            formula (str): right-hand side of the formula used to fit the model
+
+        Returns:
+            X (ndarray): design matrix (n_samples x n_parameters)
+            Y (ndarray): metabolite values (n_samples x n_metabolites)
+        """
+        if formula not in self._design_arrays:
+            exog, rows = self._design_matrix(formula)
+            X = np.ascontiguousarray(exog.to_numpy(dtype=np.float64))
+            Y = self._Y if len(rows) == len(self._Y) else self._Y[rows]
+            self._design_arrays[formula] = (X, Y)
+        return self._design_arrays[formula]
+
+    def _residual_maker(self, formula):
+        """
+        Get the residual maker matrix of the design matrix of a formula.
+
+        Parameters:
+            formula (str): right-hand side of the formula used to fit the model
+
+        Returns:
+            M (ndarray): residual maker matrix (n_samples x n_samples)
+        """
+        if formula not in self._residual_makers:
+            X, _ = self._design_array(formula)
+            self._residual_makers[formula] = _residual_maker_matrix(X)
+        return self._residual_makers[formula]
 
     def fit_linear_model(self, metabolite, formula):
         """
@@ -47,27 +191,163 @@ class ModelsHandler:
             residuals (Series): residuals from the fitted model
             model (RegressionResults): fitted model
         """
-        model = smf.ols(f"Q('{metabolite}') ~ {formula}", self.merged)
-        fitted_model = model.fit()
-        residuals = fitted_model.resid
-        return residuals, model
+        fitted_model = self._fit_linear_model(metabolite, formula)
+        return fitted_model.resid, fitted_model.model
+
+    def _fit_linear_model(self, metabolite, formula):
+        """
+        Fit a linear model for a metabolite with statsmodels.
+
+        The cached design matrix of the formula is used directly, so the
+        formula is not parsed again for every metabolite.
+
+        Parameters:
+            metabolite (str): name of metabolite to fit model for
+            formula (str): right-hand side of the formula used to fit the model
+
+        Returns:
+            fitted_model (RegressionResults): fitted model
+        """
+        exog, rows = self._design_matrix(formula)
+        endog = self.merged[metabolite].iloc[rows]
+        return sm.OLS(endog, exog, missing="drop").fit()
+
+    @staticmethod
+    def _summarize_linear_model(fitted_model):
+        """
+        Extract the quantities usually needed downstream from a fitted model.
+
+        Parameters:
+            fitted_model (RegressionResults): fitted model
+
+        Returns:
+            summary (FitSummary): parameters and statistics of the fitted model
+        """
+        return FitSummary(
+            parameter_names=np.asarray(fitted_model.params.index, dtype=str),
+            params=fitted_model.params.to_numpy(),
+            bse=fitted_model.bse.to_numpy(),
+            tvalues=fitted_model.tvalues.to_numpy(),
+            pvalues=fitted_model.pvalues.to_numpy(),
+            rsquared=np.float64(fitted_model.rsquared),
+            samples=np.asarray(fitted_model.resid.index, dtype=str),
+            resid=fitted_model.resid.to_numpy(),
+        )
+
+    def _linear_model_residuals(self, formula, projection=False):
+        """
+        Compute the linear model residuals for all metabolites at once.
 
-    def get_linear_model_residuals(self, formula, models_path=None):
+        The design matrix is built a single time from the formula and the
+        metabolites are grouped by their pattern of missing values; each group
+        is solved as a single multi-output least squares problem on the samples
+        it has values for, as statsmodels would do when fitting them one by one.
+
+        With projection, the residuals of the metabolites without missing
+        values are instead obtained by multiplying them by the residual maker
+        matrix of the design, which is computed once per formula.
+
+        Parameters:
+            formula (str): right-hand side of the formula used to fit the model
+            projection (bool): whether to use the residual maker matrix
+
+        Returns:
+            residuals (DataFrame): dataframe of residuals for all metabolites
+        """
+        exog, _ = self._design_matrix(formula)
+        X, Y = self._design_array(formula)
+        residuals = np.full(Y.shape, np.nan)
+        missing = np.isnan(Y)
+        groups = {}
+        for column in range(Y.shape[1]):
+            groups.setdefault(missing[:, column].tobytes(), []).append(column)
+        for columns in groups.values():
+            rows = np.flatnonzero(~missing[:, columns[0]])
+            if projection and len(rows) == len(X):
+                residuals[:, columns] = self._residual_maker(formula) @ Y[:, columns]
+                continue
+            residuals[np.ix_(rows, columns)] = _least_squares_residuals(
+                X[rows], Y[np.ix_(rows, columns)]
+            )
+        return pd.DataFrame(
+            residuals, index=exog.index, columns=self.data_manager.metabolites
+        )
+
+    def _serialize_linear_model(self, metabolite, formula, save_full=False):
+        """
+        Fit the linear model for a metabolite and serialize it.
+
+        By default only the model summary is serialized, as a .npz file with
+        one array per field of FitSummary. If save_full is True, the whole
+        model is serialized as a pickle file, with the highest pickle protocol;
+        dill is only used for the objects that the standard pickle cannot handle.
+
+        Parameters:
+            metabolite (str): name of metabolite to fit model for
+            formula (str): right-hand side of the formula used to fit the model
+            save_full (bool): whether to save the full model instead of its summary
+
+        Returns:
+            file_name (str): name of the file of the model in the archive
+            serialized (bytes): content of the file
+        """
+        fitted_model = self._fit_linear_model(metabolite, formula)
+        if not save_full:
+            summary = self._summarize_linear_model(fitted_model)
+            buffer = io.BytesIO()
+            np.savez_compressed(buffer, **summary._asdict())
+            return f"{metabolite}.npz", buffer.getvalue()
+        model = fitted_model.model
+        try:
+            serialized = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            # e.g. local functions or locks held by the model
+            serialized = dill.dumps(model)
+        return f"{metabolite}.pickle", serialized
+
+    def get_linear_model_residuals(
+        self, formula, models_path=None, threads=1, save_full=False, projection=False
+    ):
         """
         Fit a linear model for each metabolite and extract residuals.
 
+        The residuals are computed for all metabolites with a single least
+        squares solve; the statsmodels models are only fitted when they have
+        to be saved, in parallel over the metabolites if more than one thread
+        is used. The models are saved in a single uncompressed zip archive,
+        models.zip, with one file per metabolite.
+
         Parameters:
-            models_path (str): path to directory where models will be saved
+            formula (str): right-hand side of the formula used to fit the model
+            models_path (str): path to directory where the models archive will be saved
+            threads (int): number of threads used to fit and save the models;
+                -1 uses all the available cores
+            save_full (bool): whether to save the full models as pickle files
+                instead of their summaries as .npz files
+            projection (bool): whether to compute the residuals of the
+                metabolites without missing values with the residual maker
+                matrix I - X(X'X)^-1X' of the design, which is kept for later
+                calls with the same formula; it takes n_samples^2 memory
 
         Returns:
             residuals (DataFrame): dataframe of residuals for all metabolites
         """
+        residuals = self._linear_model_residuals(formula, projection)
+        if residuals.index.equals(self.residuals.index):
+            self.residuals = residuals
+        else:
+            self.residuals = residuals.reindex(index=self.residuals.index)
         if models_path:
             create_directory(models_path)
-        for metabolite in self.data_manager.metabolites:
-            residuals, model = self.fit_linear_model(metabolite, formula)
-            self.residuals[metabolite] = residuals
-            if models_path:
-                with open(f"{models_path}/{metabolite}.pickle", "wb") as handle:
-                    dill.dump(model, handle)
+            serialized_models = Parallel(
+                n_jobs=threads, prefer="threads", return_as="generator"
+            )(
+                delayed(self._serialize_linear_model)(metabolite, formula, save_full)
+                for metabolite in self.data_manager.metabolites
+            )
+            with zipfile.ZipFile(
+                f"{models_path}/models.zip", "w", compression=zipfile.ZIP_STORED
+            ) as archive:
+                for file_name, serialized in serialized_models:
+                    archive.writestr(file_name, serialized)
         return self.residuals
@@ -2,10 +2,205 @@
 Module for parsing input data
 """
 
+import hashlib
+import os
+import shutil
+from collections.abc import Mapping
 from typing import Union
+import numpy as np
 import pandas as pd
 from metabotk.utils import parse_input
 
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+# Excel reader engine; calamine is much faster than the default openpyxl
+_EXCEL_ENGINE = "calamine" if python_calamine is not None else None
+# optional sheets of the Client Data Table, with the class attributes they are
+# assigned to and whether they contain metabolite data
+OPTIONAL_SHEETS = {
+    "Data Key & Explanation": ("data_key_and_explanation", False),
+    "Peak Area Data": ("peak_area_data", True),
+    "Batch-normalized Data": ("batch_normalized_data", True),
+    "Batch-norm Imputed Data": ("batch_normalized_imputed_data", True),
+    "Log Transformed Data": ("log_transformed_data", True),
+}
+# cache key of the list of the sheet names of an Excel file, which cannot be
+# the name of a sheet as it contains brackets
+_SHEET_NAMES_KEY = "[sheet names]"
+
+
+class _SheetCache:
+    """
+    On-disk cache of the parsed sheets of an Excel file.
+
+    The sheets are pickled in a directory next to the Excel file, whose name
+    contains the modification time and the size of the file, so that a
+    modified file never reads the sheets cached for a previous version.
+    """
+
+    def __init__(self, file_path) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            file_path (str): The file path to the Excel file.
+        """
+        file_path = os.fspath(file_path)
+        stat = os.stat(file_path)
+        self._prefix = file_path + ".cache-"
+        self.directory = f"{self._prefix}{stat.st_mtime_ns}-{stat.st_size}"
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + ".pkl")
+
+    def load(self, key):
+        """
+        Load a cached object.
+
+        Args:
+            key (str): Name of the object, e.g. the name of a sheet.
+
+        Returns:
+            The cached object, or None if it is not in the cache.
+        """
+        try:
+            return pd.read_pickle(self._path(key))
+        except FileNotFoundError:
+            return None
+
+    def store(self, key, value):
+        """
+        Store an object in the cache, removing the caches of previous
+        versions of the Excel file.
+
+        The cache is skipped if it cannot be written, e.g. if the directory
+        of the Excel file is read-only.
+
+        Args:
+            key (str): Name of the object, e.g. the name of a sheet.
+            value: Object to cache.
+        """
+        try:
+            if not os.path.isdir(self.directory):
+                self._remove_stale()
+                os.makedirs(self.directory, exist_ok=True)
+            # write to a temporary file first, so that an interrupted write
+            # never leaves a truncated sheet in the cache
+            path = self._path(key)
+            temporary_path = f"{path}.{os.getpid()}.tmp"
+            pd.to_pickle(value, temporary_path)
+            os.replace(temporary_path, path)
+        except OSError:
+            pass
+
+    def _remove_stale(self):
+        parent = os.path.dirname(self._prefix) or "."
+        name_prefix = os.path.basename(self._prefix)
+        for name in os.listdir(parent):
+            path = os.path.join(parent, name)
+            if name.startswith(name_prefix) and path != self.directory:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+class ExcelSheets(Mapping):
+    """
+    Read-only mapping of sheet names to the sheets of an Excel file.
+
+    The sheets are read from the file the first time they are accessed, and
+    kept in memory afterwards.
+    """
+
+    def __init__(self, file_path, sheet_names, cache=None) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            file_path (str): The file path to the Excel file.
+            sheet_names (list): Names of the sheets in the mapping.
+            cache (_SheetCache, optional): On-disk cache the sheets are read
+                from, and stored in once read from the file.
+        """
+        self._file_path = file_path
+        self._sheet_names = list(sheet_names)
+        self._sheets = {}
+        self._cache = cache
+
+    def __getitem__(self, sheet_name):
+        if sheet_name not in self._sheet_names:
+            raise KeyError(sheet_name)
+        if sheet_name not in self._sheets:
+            sheet = None
+            if self._cache is not None:
+                sheet = self._cache.load(sheet_name)
+            if sheet is None:
+                sheet = pd.read_excel(
+                    self._file_path, sheet_name=sheet_name, engine=_EXCEL_ENGINE
+                )
+                if self._cache is not None:
+                    self._cache.store(sheet_name, sheet)
+            self._sheets[sheet_name] = sheet
+        return self._sheets[sheet_name]
+
+    def __iter__(self):
+        return iter(self._sheet_names)
+
+    def __len__(self):
+        return len(self._sheet_names)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._file_path!r}, {self._sheet_names})"
+
+
+class _LazySheet:
+    """
+    Sheet of an Excel file which is read only when it is loaded.
+    """
+
+    def __init__(self, sheets, sheet_name, convert=None) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            sheets (ExcelSheets): Sheets of the Excel file.
+            sheet_name (str): Name of the sheet.
+            convert (callable, optional): Function applied to the sheet when
+                it is loaded.
+        """
+        self._sheets = sheets
+        self._sheet_name = sheet_name
+        self._convert = convert
+
+    def load(self):
+        sheet = self._sheets[self._sheet_name]
+        if self._convert is not None:
+            sheet = self._convert(sheet)
+        return sheet
+
+
+class _LazyAttribute:
+    """
+    Attribute which loads its value on first access, if set to a _LazySheet.
+    """
+
+    def __set_name__(self, owner, name):
+        self._attribute_name = "_" + name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = instance.__dict__.get(self._attribute_name)
+        if isinstance(value, _LazySheet):
+            value = value.load()
+            instance.__dict__[self._attribute_name] = value
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self._attribute_name] = value
+
 
 class MetabolonCDT:
     """
@@ -19,12 +214,32 @@ class MetabolonCDT:
     - batch_normalized_data: DataFrame containing batch-normalized data and a column with the sample names. (optional)
     - batch_normalized_imputed_data: DataFrame containing batch-norm imputed data and a column with the sample names. (optional)
     - log_transformed_data: DataFrame containing log-transformed data and a column with the sample names.(optional)
+    - additional_data: Mapping of the names of any other sheet to its DataFrame, read when first accessed.
+    - data_dtype: float32 or float64 dtype the float columns of the data tables are converted to, if not None.
+
+    When imported from Excel, the optional sheets are only read when their
+    attribute is first accessed.
     """
 
-    def __init__(self) -> None:
+    data_key_and_explanation = _LazyAttribute()
+    peak_area_data = _LazyAttribute()
+    batch_normalized_data = _LazyAttribute()
+    batch_normalized_imputed_data = _LazyAttribute()
+    log_transformed_data = _LazyAttribute()
+
+    def __init__(self, data_dtype=None) -> None:
         """
         Initialize the class.
+
+        Args:
+            data_dtype: Dtype to convert the float columns of the data tables
+                to when they are imported, either float32 (to halve their
+                memory) or float64; None keeps them as read. Default is None.
+
+        Raises:
+            ValueError: If data_dtype is not None, float32 or float64.
         """
+        self.data_dtype = self._validate_data_dtype(data_dtype)
         self.data_key_and_explanation = None
         self.sample_metadata = None
         self.chemical_annotation = None
@@ -41,45 +256,127 @@ class MetabolonCDT:
         sample_metadata: str = "Sample Meta Data",
         chemical_annotation: str = "Chemical Annotation",
         data: str = "Peak Area Data",
+        cache: bool = False,
     ) -> None:
         """
         Read the Metabolon Client Data Table Excel file and assign its sheets to class attributes.
 
+        The workbook is opened once, with the calamine engine if
+        python-calamine is installed, and the required sheets are checked
+        before any sheet is parsed. Only the required sheets are parsed right
+        away; the known optional sheets are read when their attribute is first
+        accessed, and any other sheet is put in `additional_data`, where it is
+        only read when it is accessed.
+
+        With `cache`, the parsed sheets are also stored in a directory next
+        to the Excel file (`<file_path>.cache-<mtime>-<size>`), and read from
+        there instead of being parsed again by the following imports of the
+        same, unmodified file. The sheets are stored with pickle, so the cache
+        should only be enabled for files in trusted directories.
+
         Args:
             file_path (str): The file path to the Metabolon Excel file.
+            cache (bool, optional): Whether to cache the parsed sheets on
+                disk. Default is False.
 
         Raises:
             ValueError: If any required sheet ('Sample Meta Data', 'Chemical Annotation',
             'Peak Area Data') is missing from the Excel file.
         """
-        # Read Excel file
-        sheets = pd.read_excel(file_path, sheet_name=None)
-
-        # Check if required sheets are missing
-        missing_sheets = [
-            sheet_name
-            for sheet_name in [
-                sample_metadata,
-                chemical_annotation,
-                data,
-            ]
-            if sheet_name not in sheets
-        ]
+        sheet_cache = _SheetCache(file_path) if cache else None
+        sheet_names = None
+        if sheet_cache is not None:
+            sheet_names = sheet_cache.load(_SHEET_NAMES_KEY)
+
+        if sheet_names is None:
+            with pd.ExcelFile(file_path, engine=_EXCEL_ENGINE) as excel_file:
+                sheet_names = excel_file.sheet_names
+                required_sheets = self._check_required_sheets(
+                    sheet_names, sample_metadata, chemical_annotation, data
+                )
+                # Read only the required sheets
+                sheets = {
+                    sheet_name: excel_file.parse(sheet_name)
+                    for sheet_name in required_sheets
+                }
+            if sheet_cache is not None:
+                for sheet_name, sheet in sheets.items():
+                    sheet_cache.store(sheet_name, sheet)
+                sheet_cache.store(_SHEET_NAMES_KEY, sheet_names)
+        else:
+            required_sheets = self._check_required_sheets(
+                sheet_names, sample_metadata, chemical_annotation, data
+            )
+            sheets = ExcelSheets(file_path, required_sheets, sheet_cache)
+
+        # Split the other sheets in a single pass: optional sheets not used
+        # as required sheets are read on first access, and any other sheet
+        # goes to additional_data
+        optional_sheet_names = []
+        additional_sheet_names = []
+        for sheet_name in sheet_names:
+            if sheet_name in required_sheets:
+                continue
+            if sheet_name in OPTIONAL_SHEETS:
+                optional_sheet_names.append(sheet_name)
+            else:
+                additional_sheet_names.append(sheet_name)
+        optional_sheets = ExcelSheets(file_path, optional_sheet_names, sheet_cache)
+
+        # Assign sheets to attributes
+        self.sample_metadata = sheets[sample_metadata]
+        self.chemical_annotation = sheets[chemical_annotation]
+        self.generic_data = self._convert_data(sheets[data])
+        for sheet_name, (attribute, is_data) in OPTIONAL_SHEETS.items():
+            convert = self._convert_data if is_data else None
+            setattr(
+                self, attribute, self._lazy_sheet(optional_sheets, sheet_name, convert)
+            )
+        self.additional_data = ExcelSheets(
+            file_path, additional_sheet_names, sheet_cache
+        )
+
+    @staticmethod
+    def _check_required_sheets(sheet_names, sample_metadata, chemical_annotation, data):
+        """
+        Check that the required sheets are in the Excel file.
+
+        Args:
+            sheet_names (list): Names of the sheets of the Excel file.
+
+        Returns:
+            The set of the names of the required sheets.
+
+        Raises:
+            ValueError: If any required sheet is missing from the Excel file.
+        """
+        required_sheets = {sample_metadata, chemical_annotation, data}
+        missing_sheets = required_sheets.difference(sheet_names)
         if missing_sheets:
             raise ValueError(
-                "The following required sheets are missing: {}".format(missing_sheets)
+                "The following required sheets are missing: {}".format(
+                    sorted(missing_sheets)
+                )
             )
+        return required_sheets
 
-        # Assign sheets to attributes
-        self.data_key_and_explanation = sheets.pop("Data Key & Explanation", None)
-        self.sample_metadata = sheets.pop(sample_metadata)
-        self.chemical_annotation = sheets.pop(chemical_annotation)
-        self.generic_data = sheets.pop(data)
-        self.peak_area_data = sheets.pop("Peak Area Data", None)
-        self.batch_normalized_data = sheets.pop("Batch-normalized Data", None)
-        self.batch_normalized_imputed_data = sheets.pop("Batch-norm Imputed Data", None)
-        self.log_transformed_data = sheets.pop("Log Transformed Data", None)
-        self.additional_data = sheets
+    @staticmethod
+    def _lazy_sheet(sheets, sheet_name, convert=None):
+        """
+        Get a lazily read optional sheet.
+
+        Args:
+            sheets (ExcelSheets): Optional sheets of the Excel file.
+            sheet_name (str): Name of the sheet.
+            convert (callable, optional): Function applied to the sheet when
+                it is read.
+
+        Returns:
+            A _LazySheet for the sheet, or None if the sheet is not in `sheets`.
+        """
+        if sheet_name not in sheets:
+            return None
+        return _LazySheet(sheets, sheet_name, convert)
 
     def import_tables(
         self,
@@ -109,30 +406,79 @@ class MetabolonCDT:
         self.sample_metadata = parse_input(sample_metadata)
         # Read chemical annotation
         self.chemical_annotation = parse_input(chemical_annotation)
-        # Read peak area data
-        try:
-            self.peak_area_data = parse_input(peak_area_data)
-        except TypeError:
-            self.peak_area_data = None
-        # Read batch normalized data
+        # Read the optional metabolite data
+        self.peak_area_data = self._convert_data(
+            self._parse_optional_input(peak_area_data)
+        )
+        self.batch_normalized_data = self._convert_data(
+            self._parse_optional_input(batch_normalized_data)
+        )
+        self.batch_normalized_imputed_data = self._convert_data(
+            self._parse_optional_input(batch_normalized_imputed_data)
+        )
+        self.log_transformed_data = self._convert_data(
+            self._parse_optional_input(log_transformed_data)
+        )
+        self.generic_data = self._convert_data(self._parse_optional_input(generic_data))
+
+    @staticmethod
+    def _validate_data_dtype(data_dtype):
+        """
+        Validate the dtype the data tables are converted to.
+
+        Args:
+            data_dtype: None, or a float32 or float64 dtype (e.g. "float32").
+
+        Returns:
+            The NumPy dtype, or None.
+
+        Raises:
+            ValueError: If data_dtype is not None, float32 or float64.
+        """
+        if data_dtype is None:
+            return None
         try:
-            self.batch_normalized_data = parse_input(batch_normalized_data)
+            dtype = np.dtype(data_dtype)
         except TypeError:
-            self.batch_normalized_data = None
-        # Read batch normalized imputed data
-        try:
-            self.batch_normalized_imputed_data = parse_input(
-                batch_normalized_imputed_data
+            dtype = None
+        if dtype not in (np.float32, np.float64):
+            raise ValueError(
+                f"data_dtype must be float32, float64 or None, not {data_dtype!r}"
             )
-        except TypeError:
-            self.batch_normalized_imputed_data = None
-        # Read log transformed data
-        try:
-            self.log_transformed_data = parse_input(log_transformed_data)
-        except TypeError:
-            self.log_transformed_data = None
-        # Read generic data
-        try:
-            self.generic_data = parse_input(generic_data)
-        except TypeError:
-            self.generic_data = None
+        return dtype
+
+    def _convert_data(self, data):
+        """
+        Convert the float columns of a data table to `data_dtype`.
+
+        The sample names and any non-float column are left unchanged.
+
+        Args:
+            data: DataFrame containing the data, or None.
+
+        Returns:
+            The converted DataFrame, or the input if `data_dtype` is None.
+        """
+        if data is None or self.data_dtype is None:
+            return data
+        float_columns = data.select_dtypes("floating").columns
+        return data.astype(dict.fromkeys(float_columns, self.data_dtype))
+
+    @staticmethod
+    def _parse_optional_input(input_data):
+        """
+        Parse an optional input table.
+
+        Args:
+            input_data: DataFrame, path of file containing the table, or None.
+
+        Returns:
+            The parsed DataFrame, or None if no input was given.
+
+        Raises:
+            TypeError: If the input is neither None, a DataFrame nor a path to
+            a TSV or CSV file.
+        """
+        if input_data is None:
+            return None
+        return parse_input(input_data)
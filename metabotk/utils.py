@@ -2,6 +2,17 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.csv
+except ImportError:
+    pyarrow = None
+
+_CSV_ENGINE = "pyarrow" if pyarrow is not None else None
+# dtype used for sample and metabolite IDs
+ID_DTYPE = pd.StringDtype("pyarrow" if pyarrow is not None else "python")
+
 
 def validate_dataframe(data_frame):
     """
@@ -54,6 +65,222 @@ def ensure_numeric_data(data):
     return data
 
 
+def read_delimited_file(file_path, sep):
+    """
+    Read a delimited text file into a pandas DataFrame.
+
+    If pyarrow is installed the file is parsed with its multithreaded CSV
+    reader, otherwise with the default pandas parser. The output of the two
+    is made as close as possible: column names are deduplicated as pandas
+    does, missing values are NaN and dates and times are kept as strings.
+    pyarrow parses dates, times and timestamps on its own, so files with such
+    columns, as well as files without rows, are read again with the default
+    pandas parser. Differences remain for unusual values, e.g. integers
+    beyond the int64 range are read as floats by pyarrow, not as uint64.
+
+    Parameters
+    ----------
+    file_path : str
+        Path of the file to read.
+    sep : str
+        Delimiter of the columns.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Content of the file.
+    """
+    if _CSV_ENGINE is None:
+        return pd.read_csv(file_path, sep=sep)
+    try:
+        data = pd.read_csv(file_path, sep=sep, engine=_CSV_ENGINE)
+    except pd.errors.ParserError:
+        return pd.read_csv(file_path, sep=sep)
+    if data.empty or _has_temporal_column(data):
+        return pd.read_csv(file_path, sep=sep)
+    if data.columns.has_duplicates or (data.columns == "").any():
+        data.columns = pd.read_csv(file_path, sep=sep, nrows=0).columns
+    for position in np.flatnonzero(data.dtypes.to_numpy() == object):
+        values = data.iloc[:, position]
+        data.isetitem(position, values.where(values.notna(), np.nan))
+    return data
+
+
+def _has_temporal_column(data_frame):
+    """
+    Whether pyarrow parsed a column as dates, times or timestamps.
+
+    pandas keeps these columns as strings.
+    """
+    for position, dtype in enumerate(data_frame.dtypes):
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            return True
+        if dtype == object and pd.api.types.infer_dtype(
+            data_frame.iloc[:, position], skipna=True
+        ) in ("date", "time", "datetime"):
+            return True
+    return False
+
+
+def _is_plain_arrow_type(arrow_type):
+    """
+    Whether pyarrow writes values of this type as pandas' to_csv would.
+    """
+    types = pyarrow.types
+    return (
+        types.is_integer(arrow_type)
+        or types.is_floating(arrow_type)
+        or types.is_string(arrow_type)
+        or types.is_large_string(arrow_type)
+        or types.is_null(arrow_type)
+    )
+
+
+# integral floats below this magnitude are written by to_csv as "<integer>.0"
+_MAX_EXACT_INTEGER = 2**53
+
+
+def _integral_floats_as_text(values):
+    """
+    Format float64 columns holding only integral values as to_csv would.
+
+    pyarrow writes these values without the trailing ".0", so the columns
+    would be read back as integers.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        float64 values of the columns (n_rows x n_columns).
+
+    Returns
+    -------
+    list of pyarrow.StringArray or None
+        The formatted values of each column, with nulls for NaN, or None if
+        the columns also hold values that to_csv formats differently, e.g. in
+        exponent notation or as -0.0.
+    """
+    n_rows = values.shape[0]
+    values = values.ravel(order="F")
+    observed = ~np.isnan(values)
+    observed_values = values[observed]
+    if (np.abs(observed_values) >= _MAX_EXACT_INTEGER).any() or np.signbit(
+        observed_values[observed_values == 0]
+    ).any():
+        return None
+    integers = pyarrow.array(values, mask=~observed).cast(pyarrow.int64())
+    text = pyarrow.compute.binary_join_element_wise(
+        integers.cast(pyarrow.string()), ".0", ""
+    )
+    return [text.slice(start, n_rows) for start in range(0, len(text), n_rows)]
+
+
+def _format_integral_float_columns(frame, table):
+    """
+    Replace the float columns holding only integral values with their text.
+
+    Parameters
+    ----------
+    frame : pandas.DataFrame
+        DataFrame the table was built from.
+    table : pyarrow.Table
+        Table to write, with the same columns as frame.
+
+    Returns
+    -------
+    pyarrow.Table or None
+        The table with the integral float columns formatted as to_csv would,
+        or None if a column cannot be formatted this way.
+    """
+    dtypes = list(frame.dtypes)
+    float_positions = [
+        position
+        for position, dtype in enumerate(dtypes)
+        if isinstance(dtype, np.dtype) and dtype.kind == "f"
+    ]
+    if not float_positions:
+        return table
+    values = frame.iloc[:, float_positions].to_numpy(dtype=np.float64)
+    observed = ~np.isnan(values)
+    integral = ((values == np.trunc(values)) | ~observed).all(axis=0) & observed.any(
+        axis=0
+    )
+    if not integral.any():
+        return table
+    integral_positions = [
+        float_positions[column] for column in np.flatnonzero(integral)
+    ]
+    if any(dtypes[position] != np.float64 for position in integral_positions):
+        # float32 values are rounded differently by to_csv
+        return None
+    texts = _integral_floats_as_text(values[:, integral])
+    if texts is None:
+        return None
+    columns = table.columns
+    for position, text in zip(integral_positions, texts):
+        columns[position] = text
+    return pyarrow.Table.from_arrays(columns, names=table.column_names)
+
+
+def _has_unique_labels(data_frame):
+    """
+    Whether the columns and index names can be turned into a pyarrow table.
+
+    pyarrow needs unique column names, including those of the index levels.
+    """
+    index_names = [name for name in data_frame.index.names if name is not None]
+    labels = list(data_frame.columns) + index_names
+    return data_frame.columns.is_unique and len(set(labels)) == len(labels)
+
+
+def write_delimited_file(data_frame, file_path, sep="\t"):
+    """
+    Write a pandas DataFrame, including its index, to a delimited text file.
+
+    If pyarrow is installed the rows are written with its multithreaded CSV
+    writer, otherwise with DataFrame.to_csv. The header is always written by
+    pandas. Float columns holding only integral values are formatted as
+    to_csv would ("1.0"), so they can still be written by pyarrow. Tables are
+    written with DataFrame.to_csv instead if they have values that would
+    need quoting, duplicate column or index names, columns other than
+    numbers and strings, or integral float columns that cannot be formatted
+    this way (float32 columns, values of magnitude 2**53 or more, or -0.0).
+    Other floats may be formatted differently by pyarrow (e.g. 1e-7 instead
+    of 1e-07), but are read back to the same values.
+
+    Parameters
+    ----------
+    data_frame : pandas.DataFrame
+        DataFrame to write.
+    file_path : str
+        Path of the file to write.
+    sep : str
+        Delimiter of the columns.
+    """
+    if pyarrow is not None and _has_unique_labels(data_frame):
+        try:
+            frame = data_frame.reset_index(names=data_frame.index.names)
+            table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+            table = _format_integral_float_columns(frame, table)
+            if table is not None and all(
+                _is_plain_arrow_type(field.type) for field in table.schema
+            ):
+                with open(file_path, "wb") as file:
+                    file.write(data_frame.iloc[:0].to_csv(sep=sep).encode())
+                    pyarrow.csv.write_csv(
+                        table,
+                        file,
+                        write_options=pyarrow.csv.WriteOptions(
+                            include_header=False,
+                            delimiter=sep,
+                            quoting_style="none",
+                        ),
+                    )
+                return
+        except (pyarrow.ArrowException, ValueError, TypeError):
+            pass
+    data_frame.to_csv(file_path, sep=sep)
+
+
 def parse_input(input_data):
     """
     Parse input data as pandas dataframe or as file path to TSV or CSV file
@@ -84,10 +311,10 @@ def parse_input(input_data):
     elif isinstance(input_data, str):
         if input_data.endswith((".tsv", ".csv")):
             if input_data.endswith(".tsv"):
-                data = pd.read_table(input_data, sep="\t").reset_index(drop=True)
+                data = read_delimited_file(input_data, sep="\t")
             elif input_data.endswith(".csv"):
-                data = pd.read_csv(input_data).reset_index(drop=True)
-            return data
+                data = read_delimited_file(input_data, sep=",")
+            return data.reset_index(drop=True)
         else:
             raise TypeError(
                 "Input should be a Pandas DataFrame or a file path to a TSV or CSV file."
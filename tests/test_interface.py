@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 import pandas as pd
 from metabotk.providers_handler import MetabolonCDT
 from metabotk.statistics_handler import StatisticsHandler
@@ -208,6 +209,69 @@ class TestMetaboTKSplit:
         assert isinstance(split_data, dict)
 
 
+def create_synthetic_instance(**kwargs):
+    # Small synthetic dataset with missing values
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(8, 6))
+    values[rng.random(values.shape) < 0.3] = np.nan
+    samples = [f"S{i}" for i in range(8)]
+    metabolites = [f"M{i}" for i in range(6)]
+    data = pd.DataFrame(values, columns=metabolites)
+    data.insert(0, "PARENT_SAMPLE_NAME", samples)
+    metabotk = MetaboTK(**kwargs)
+    metabotk.import_tables(
+        data=data,
+        chemical_annotation=pd.DataFrame({"CHEM_ID": metabolites}),
+        sample_metadata=pd.DataFrame({"PARENT_SAMPLE_NAME": samples}),
+    )
+    return metabotk
+
+
+@pytest.fixture
+def metabotk_instance_with_missing():
+    return create_synthetic_instance()
+
+
+def test_data_dtype():
+    metabotk_instance = create_synthetic_instance(data_dtype="float32")
+    assert (metabotk_instance.data.dtypes == "float32").all()
+
+
+class TestMetaboTKMissing:
+    @pytest.mark.parametrize("axis", [0, 1])
+    def test_drop_missing_returns_copy(self, metabotk_instance_with_missing, axis):
+        # Nothing is removed, so the handler selects the data with a view
+        data = metabotk_instance_with_missing.data.copy()
+        remaining_data = metabotk_instance_with_missing.drop_missing_from_dataframe(
+            axis=axis, threshold=1
+        )
+        remaining_data.fillna(0, inplace=True)
+        pd.testing.assert_frame_equal(metabotk_instance_with_missing.data, data)
+
+    @pytest.mark.parametrize("columns_first", [True, False])
+    @pytest.mark.parametrize("inplace", [True, False])
+    def test_drop_missing_from_both_axes(self, columns_first, inplace):
+        axes = [0, 1] if columns_first else [1, 0]
+        sequential = create_synthetic_instance()
+        for axis in axes:
+            sequential.drop_missing_from_dataframe(
+                axis=axis, threshold=0.25, inplace=True
+            )
+        metabotk_instance = create_synthetic_instance()
+        remaining_data = metabotk_instance.drop_missing_from_both_axes(
+            threshold=0.25, columns_first=columns_first, inplace=inplace
+        )
+        if inplace:
+            assert remaining_data is None
+            remaining_data = metabotk_instance.data
+            assert metabotk_instance.samples == list(remaining_data.index)
+            assert metabotk_instance.metabolites == list(remaining_data.columns)
+        else:
+            assert metabotk_instance.data.shape == (8, 6)
+        assert remaining_data.shape != (8, 6)
+        pd.testing.assert_frame_equal(remaining_data, sequential.data)
+
+
 # Add more test classes for other classes if necessary
 
 if __name__ == "__main__":
@@ -48,6 +48,24 @@ class TestDetectMissingValues:
             [False, True, False, True, False, False, False],
         )
 
+    @pytest.mark.parametrize(
+        "data",
+        [
+            pd.Series([1.0, np.nan, 3.0]),
+            pd.Series([1, 2, 3]),
+            pd.Series([True, False, True]),
+            pd.Series(["a", None, "c"]),
+            pd.Series([1, None, 3], dtype="Int64"),
+            pd.Series([1.0, None, 3.0], dtype="Float64"),
+            pd.Series(["a", None, "c"], dtype="string"),
+        ],
+    )
+    def test_series_dtypes(self, data):
+        # NumPy and extension dtypes take different paths
+        expected = data.isna().to_numpy()
+        assert np.array_equal(missing_handler._missing_mask(data), expected)
+        assert missing_handler._detect_missing(data).equals(data.isna())
+
     def test_empty_input(self):
         with warnings.catch_warnings():
             # Filter out the specific warning related to nanmean on an empty slice
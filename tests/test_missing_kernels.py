@@ -0,0 +1,49 @@
+import pytest
+import numpy as np
+from metabotk import _missing_kernels
+
+
+def create_values_with_missing(layout, dtype=np.float64):
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(60, 700)).astype(dtype)
+    values[rng.random(values.shape) < 0.2] = np.nan
+    if layout == "C":
+        return values
+    if layout == "F":
+        return np.asfortranarray(values)
+    if layout == "sliced":
+        return values[::2, ::3]
+    if layout == "sliced_F":
+        return np.asfortranarray(values)[1::2, ::3]
+
+
+layouts = ["C", "F", "sliced", "sliced_F"]
+
+
+@pytest.mark.parametrize("layout", layouts)
+@pytest.mark.parametrize("axis", [0, 1])
+@pytest.mark.parametrize("dtype", [np.float64, np.float32, np.float16])
+def test_nan_counts(layout, axis, dtype):
+    values = create_values_with_missing(layout, dtype)
+    counts = _missing_kernels.nan_counts(values, axis=axis)
+    assert np.array_equal(counts, np.isnan(values).sum(axis=axis))
+
+
+@pytest.mark.parametrize("layout", layouts)
+@pytest.mark.parametrize("axis", [0, 1])
+def test_nan_counts_blocked(monkeypatch, layout, axis):
+    # small blocks, so that the mask is built in several steps
+    monkeypatch.setattr(_missing_kernels, "MASK_BLOCK_SIZE", 1000)
+    values = create_values_with_missing(layout)
+    counts = _missing_kernels._nan_counts_blocked(values, axis=axis)
+    assert np.array_equal(counts, np.isnan(values).sum(axis=axis))
+
+
+@pytest.mark.parametrize("shape", [(0, 5), (5, 0), (0, 0)])
+@pytest.mark.parametrize("axis", [0, 1])
+def test_nan_counts_empty(shape, axis):
+    values = np.empty(shape)
+    counts = _missing_kernels.nan_counts(values, axis=axis)
+    assert np.array_equal(counts, np.zeros(shape[1 - axis]))
+    counts = _missing_kernels._nan_counts_blocked(values, axis=axis)
+    assert np.array_equal(counts, np.zeros(shape[1 - axis]))
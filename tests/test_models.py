@@ -0,0 +1,158 @@
+import io
+import pickle
+import threading
+import zipfile
+import dill
+import pytest
+import numpy as np
+import pandas as pd
+import statsmodels.formula.api as smf
+from metabotk.interface import MetaboTK
+
+
+def create_models_instance():
+    # Synthetic dataset with covariates and metabolites with missing values
+    rng = np.random.default_rng(0)
+    n_samples, n_metabolites = 40, 12
+    samples = [f"S{i}" for i in range(n_samples)]
+    metabolites = [f"M{i}" for i in range(n_metabolites)]
+    sample_metadata = pd.DataFrame(
+        {
+            "PARENT_SAMPLE_NAME": samples,
+            "batch": rng.choice(["a", "b", "c"], n_samples),
+            "sex": rng.choice(["F", "M"], n_samples),
+            "weight": rng.normal(70, 10, n_samples),
+        }
+    )
+    # collinear covariate, for a rank deficient design
+    sample_metadata["weight_kg"] = sample_metadata["weight"] * 2
+    sample_metadata.loc[3, "weight"] = np.nan
+    values = rng.normal(size=(n_samples, n_metabolites)) + sample_metadata[
+        ["weight"]
+    ].fillna(70).to_numpy() * rng.normal(size=n_metabolites)
+    # two metabolites share a pattern of missing values, one has its own
+    values[[1, 5, 9], 0] = np.nan
+    values[[1, 5, 9], 1] = np.nan
+    values[[0, 2], 2] = np.nan
+    data = pd.DataFrame(values, columns=metabolites)
+    data.insert(0, "PARENT_SAMPLE_NAME", samples)
+    metabotk_instance = MetaboTK()
+    metabotk_instance.import_tables(
+        data=data,
+        chemical_annotation=pd.DataFrame({"CHEM_ID": metabolites}),
+        sample_metadata=sample_metadata,
+    )
+    return metabotk_instance
+
+
+def statsmodels_residuals(metabotk_instance, formula):
+    merged = metabotk_instance.merge_sample_metadata_data()
+    residuals = pd.DataFrame(
+        np.nan,
+        index=metabotk_instance.data.index,
+        columns=metabotk_instance.data.columns,
+    )
+    for metabolite in metabotk_instance.metabolites:
+        resid = smf.ols(f"{metabolite} ~ {formula}", data=merged).fit().resid
+        residuals.loc[resid.index, metabolite] = resid
+    return residuals
+
+
+@pytest.mark.parametrize(
+    "formula", ["C(batch) + sex + weight", "C(batch) + weight + weight_kg"]
+)
+@pytest.mark.parametrize("projection", [False, True])
+@pytest.mark.filterwarnings("ignore:The design matrix is rank-deficient")
+def test_linear_model_residuals(formula, projection):
+    metabotk_instance = create_models_instance()
+    residuals = metabotk_instance.models.get_linear_model_residuals(
+        formula, projection=projection
+    )
+    expected = statsmodels_residuals(metabotk_instance, formula)
+    assert list(residuals.index) == list(expected.index)
+    for metabolite in metabotk_instance.metabolites:
+        np.testing.assert_allclose(
+            residuals[metabolite].to_numpy(),
+            expected[metabolite].to_numpy(),
+            rtol=1e-7,
+            atol=1e-8,
+        )
+
+
+def test_linear_model_residuals_projection_reused():
+    # the residual maker of a formula is kept for later calls
+    metabotk_instance = create_models_instance()
+    formula = "C(batch) + sex + weight"
+    first = metabotk_instance.models.get_linear_model_residuals(
+        formula, projection=True
+    )
+    second = metabotk_instance.models.get_linear_model_residuals(
+        formula, projection=True
+    )
+    pd.testing.assert_frame_equal(first, second)
+
+
+@pytest.mark.parametrize("threads", [1, 2])
+def test_save_model_summaries(tmp_path, threads):
+    metabotk_instance = create_models_instance()
+    formula = "C(batch) + sex + weight"
+    metabotk_instance.models.get_linear_model_residuals(
+        formula, models_path=str(tmp_path), threads=threads
+    )
+    merged = metabotk_instance.merge_sample_metadata_data()
+    with zipfile.ZipFile(tmp_path / "models.zip") as archive:
+        assert sorted(archive.namelist()) == sorted(
+            f"{metabolite}.npz" for metabolite in metabotk_instance.metabolites
+        )
+        for metabolite in metabotk_instance.metabolites:
+            summary = np.load(io.BytesIO(archive.read(f"{metabolite}.npz")))
+            fitted_model = smf.ols(f"{metabolite} ~ {formula}", data=merged).fit()
+            assert list(summary["parameter_names"]) == list(fitted_model.params.index)
+            np.testing.assert_allclose(summary["params"], fitted_model.params)
+            np.testing.assert_allclose(summary["bse"], fitted_model.bse)
+            np.testing.assert_allclose(summary["rsquared"], fitted_model.rsquared)
+            assert list(summary["samples"]) == list(fitted_model.resid.index)
+            np.testing.assert_allclose(summary["resid"], fitted_model.resid)
+
+
+def test_save_full_models(tmp_path):
+    metabotk_instance = create_models_instance()
+    formula = "C(batch) + sex + weight"
+    metabotk_instance.models.get_linear_model_residuals(
+        formula, models_path=str(tmp_path), save_full=True
+    )
+    merged = metabotk_instance.merge_sample_metadata_data()
+    with zipfile.ZipFile(tmp_path / "models.zip") as archive:
+        assert sorted(archive.namelist()) == sorted(
+            f"{metabolite}.pickle" for metabolite in metabotk_instance.metabolites
+        )
+        for metabolite in metabotk_instance.metabolites:
+            model = pickle.loads(archive.read(f"{metabolite}.pickle"))
+            fitted_model = smf.ols(f"{metabolite} ~ {formula}", data=merged).fit()
+            np.testing.assert_allclose(model.fit().params, fitted_model.params)
+
+
+def test_save_full_models_with_dill(tmp_path):
+    # models that the standard pickle cannot handle are serialized with dill
+    def local_function():
+        return 1
+
+    metabotk_instance = create_models_instance()
+    formula = "C(batch) + sex + weight"
+    models = metabotk_instance.models
+    fit_linear_model = models._fit_linear_model
+
+    def fit_unpicklable_model(metabolite, formula):
+        fitted_model = fit_linear_model(metabolite, formula)
+        fitted_model.model.lock = threading.Lock()
+        fitted_model.model.function = local_function
+        return fitted_model
+
+    models._fit_linear_model = fit_unpicklable_model
+    models.get_linear_model_residuals(
+        formula, models_path=str(tmp_path), save_full=True
+    )
+    with zipfile.ZipFile(tmp_path / "models.zip") as archive:
+        for metabolite in metabotk_instance.metabolites:
+            model = dill.loads(archive.read(f"{metabolite}.pickle"))
+            assert model.function() == 1
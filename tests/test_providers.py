@@ -32,6 +32,48 @@ def test_read_metabolon_excel(metabolon_instance):
     assert metabolon_instance.peak_area_data is not None
 
 
+# Test case to check that optional and additional sheets are read when accessed
+def test_read_metabolon_excel_additional_sheets(metabolon_instance, tmp_path):
+    excel_path = tmp_path / "cdt.xlsx"
+    extra = pd.DataFrame({"A": [1, 2]})
+    with pd.ExcelWriter(excel_path) as writer:
+        for sheet_name in ["Sample Meta Data", "Chemical Annotation", "Peak Area Data"]:
+            pd.DataFrame({"ID": [1, 2]}).to_excel(
+                writer, sheet_name=sheet_name, index=False
+            )
+        extra.to_excel(writer, sheet_name="Extra", index=False)
+        extra.to_excel(writer, sheet_name="Log Transformed Data", index=False)
+    metabolon_instance.import_excel(str(excel_path))
+    assert list(metabolon_instance.additional_data) == ["Extra"]
+    assert metabolon_instance.additional_data["Extra"].equals(extra)
+    assert metabolon_instance.log_transformed_data.equals(extra)
+    assert metabolon_instance.batch_normalized_data is None
+
+
+# Test case to check that the cached sheets are read instead of the Excel file
+def test_read_metabolon_excel_cache(tmp_path):
+    excel_path = tmp_path / "cdt.xlsx"
+    sheet = pd.DataFrame({"ID": [1, 2], "X": [0.5, None]})
+    with pd.ExcelWriter(excel_path) as writer:
+        for sheet_name in ["Sample Meta Data", "Chemical Annotation", "Peak Area Data"]:
+            sheet.to_excel(writer, sheet_name=sheet_name, index=False)
+        sheet.to_excel(writer, sheet_name="Extra", index=False)
+    first = MetabolonCDT()
+    first.import_excel(str(excel_path), cache=True)
+    first.additional_data["Extra"]
+    cache_dirs = list(tmp_path.glob("cdt.xlsx.cache-*"))
+    assert len(cache_dirs) == 1
+    # the cached sheets are read even if the file could not be parsed anymore
+    stat = excel_path.stat()
+    excel_path.write_bytes(b"x" * stat.st_size)
+    os.utime(excel_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    second = MetabolonCDT()
+    second.import_excel(str(excel_path), cache=True)
+    assert second.generic_data.equals(first.generic_data)
+    assert second.sample_metadata.equals(sheet)
+    assert second.additional_data["Extra"].equals(sheet)
+
+
 # Test case to check reading flat tables
 def test_read_metabolon_flat_tables(metabolon_instance):
     # Mock data frames for sample metadata and chemical annotation
@@ -44,3 +86,20 @@ def test_read_metabolon_flat_tables(metabolon_instance):
     metabolon_instance.import_tables(sample_metadata_df, chemical_annotation_df)
     assert metabolon_instance.sample_metadata.shape == (3, 2)
     assert metabolon_instance.chemical_annotation.shape == (3, 2)
+
+
+# Test case to check the conversion of the data to another float dtype
+def test_read_flat_tables_data_dtype():
+    metabolon_instance = MetabolonCDT(data_dtype="float32")
+    data_df = pd.DataFrame({"ID": [1, 2], "X": [0.5, None], "Y": [1.5, 2.5]})
+    metabolon_instance.import_tables(data_df, data_df, generic_data=data_df)
+    assert metabolon_instance.generic_data["X"].dtype == "float32"
+    assert metabolon_instance.generic_data["ID"].dtype == "int64"
+    assert metabolon_instance.sample_metadata["X"].dtype == "float64"
+
+
+# Test case to check that only float32 and float64 are accepted as data dtype
+@pytest.mark.parametrize("data_dtype", ["float16", "int64", "not a dtype", object])
+def test_invalid_data_dtype(data_dtype):
+    with pytest.raises(ValueError):
+        MetabolonCDT(data_dtype=data_dtype)
@@ -1,7 +1,13 @@
 import pandas as pd
 import pytest
 import numpy as np
-from metabotk.utils import validate_dataframe, ensure_numeric_data, parse_input
+from metabotk.utils import (
+    validate_dataframe,
+    ensure_numeric_data,
+    parse_input,
+    read_delimited_file,
+    write_delimited_file,
+)
 
 
 class TestValidateDataFrame:
@@ -79,3 +85,76 @@ class TestParseInput:
         invalid_input = 123  # Not a DataFrame or a file path
         with pytest.raises(TypeError):
             parse_input(invalid_input)
+
+
+class TestReadDelimitedFile:
+    def test_same_output_as_pandas(self, tmp_path):
+        file_path = tmp_path / "table.tsv"
+        file_path.write_text(
+            "\tx\tx\tdate\tname\n0\t1.5\t2\t2020-01-01\ta\n1\t\t4\t2020-02-01\t\n"
+        )
+        data = read_delimited_file(str(file_path), sep="\t")
+        assert data.equals(pd.read_csv(file_path, sep="\t"))
+
+    def test_header_only(self, tmp_path):
+        file_path = tmp_path / "table.tsv"
+        file_path.write_text("Sample\tA\tB\n")
+        data = read_delimited_file(str(file_path), sep="\t")
+        pd.testing.assert_frame_equal(data, pd.read_csv(file_path, sep="\t"))
+
+    def test_timestamps_and_times_kept_as_strings(self, tmp_path):
+        file_path = tmp_path / "table.tsv"
+        file_path.write_text(
+            "Sample\tcollected\ttime\tvalue\n"
+            "S1\t2020-01-01 10:00\t10:30:00\t1.5\n"
+            "S2\t2020-01-02 11:00\t\t2.5\n"
+        )
+        data = read_delimited_file(str(file_path), sep="\t")
+        pd.testing.assert_frame_equal(data, pd.read_csv(file_path, sep="\t"))
+        assert data["collected"].isin(["2020-01-01 10:00"]).tolist() == [True, False]
+
+    def test_parse_input_tsv_file(self, tmp_path):
+        file_path = tmp_path / "table.tsv"
+        file_path.write_text("Sample\tA\nS1\t1.0\nS2\t\n")
+        data = parse_input(str(file_path))
+        assert list(data.columns) == ["Sample", "A"]
+        assert data["A"].isna().tolist() == [False, True]
+
+
+class TestWriteDelimitedFile:
+    def test_same_output_as_pandas(self, tmp_path):
+        data = pd.DataFrame(
+            {"name": ["a", None], "value": [1.5, np.nan], "count": [1, 2]},
+            index=pd.Index(["S1", "S2"], name="Sample"),
+        )
+        file_path = tmp_path / "table.tsv"
+        write_delimited_file(data, str(file_path))
+        assert file_path.read_text() == data.to_csv(sep="\t")
+
+    @pytest.mark.parametrize(
+        "values", [[1.0, np.nan, -3.0], [-0.0, 1.0], [2.0**53, 1.0]]
+    )
+    def test_integral_float_values(self, tmp_path, values):
+        data = pd.DataFrame({"value": values, "other": [0.5] * len(values)})
+        file_path = tmp_path / "table.tsv"
+        write_delimited_file(data, str(file_path))
+        assert file_path.read_text() == data.to_csv(sep="\t")
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            pd.DataFrame([[1.5, 2.5]], columns=["a", "a"]),
+            pd.DataFrame({"a": [1.5]}, index=pd.Index(["S1"], name="a")),
+            pd.DataFrame({"index": [1.5], "level_0": [2.5]}),
+        ],
+    )
+    def test_duplicate_labels(self, tmp_path, data):
+        file_path = tmp_path / "table.tsv"
+        write_delimited_file(data, str(file_path))
+        assert file_path.read_text() == data.to_csv(sep="\t")
+
+    def test_values_needing_quotes(self, tmp_path):
+        data = pd.DataFrame({"name": ["a\tb", 'c "d"']})
+        file_path = tmp_path / "table.tsv"
+        write_delimited_file(data, str(file_path))
+        assert file_path.read_text() == data.to_csv(sep="\t")